@@ -0,0 +1,2 @@
+# Load tests for the grades app: seed a scaled dataset, replay traffic through the test client,
+# and report latency, queries and memory per page. Run with `python -m bench --help`.
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import django
+from django.conf import settings
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cs3550.settings")
+django.setup()
+
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases
+from . import report, runner, seed, traffic
+
+# One process, so in-memory caches stand in for the shared one without touching the real cache
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench"},
+    "local": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-local"},
+}
+SESSION_ENGINES = {name: f"django.contrib.sessions.backends.{name}" for name in ["db", "cached_db", "signed_cookies"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Replay traffic against a seeded copy of the grades app.")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--tas", type=int, default=4)
+    parser.add_argument("--assignments", type=int, default=10)
+    parser.add_argument("--submission-rate", type=float, default=0.8, help="fraction of students submitting each assignment")
+    parser.add_argument("--graded-rate", type=float, default=0.5, help="fraction of submissions graded")
+    parser.add_argument("--mix", choices=sorted(traffic.MIXES), default="browse")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50, help="requests to run before measuring")
+    parser.add_argument("--replay", type=argparse.FileType(), help="JSON-lines traffic log to replay instead of a mix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--session-engine", choices=sorted(SESSION_ENGINES), default=settings.SESSION_ENGINE.rsplit(".", 1)[-1])
+    parser.add_argument("--no-user-cache", action="store_true", help="load the user from the database on every request")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="exit 1 if the results regress from this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed latency and RSS growth over the baseline")
+    options = parser.parse_args(argv)
+
+    # Seed a throwaway test database and media directory, never the development ones
+    setup_test_environment(debug=False)
+    databases = setup_databases(verbosity=0, interactive=False)
+    media = tempfile.TemporaryDirectory()
+    try:
+        auth = {"SESSION_ENGINE": SESSION_ENGINES[options.session_engine]}
+        if options.no_user_cache:
+            auth["USER_CACHE_TIMEOUT"] = None
+        with override_settings(MEDIA_ROOT=media.name, ALLOWED_HOSTS=["testserver"], PERFORMANCE_SAMPLE_RATE=0, CACHES=CACHES, **auth):
+            dataset = seed.seed(options.students, options.tas, options.assignments, options.submission_rate, options.graded_rate, seed=options.seed)
+            rss_before = report.rss_mb()
+            if options.replay:
+                requests = list(traffic.replay(options.replay))
+                warmup = 0
+            else:
+                requests = traffic.generate(dataset, options.mix, options.warmup + options.requests, options.seed)
+                warmup = options.warmup
+            results = runner.run(requests, warmup)
+            results.rss = {"seeded": rss_before, "after": report.rss_mb(), "peak": report.peak_rss_mb()}
+    finally:
+        teardown_databases(databases, verbosity=0)
+        media.cleanup()
+
+    summary = results.summary()
+    summary["config"] = {name: getattr(options, name) for name in ["students", "tas", "assignments", "submission_rate", "graded_rate", "mix", "requests", "seed", "session_engine", "no_user_cache"]}
+    if options.replay:
+        summary["config"]["replay"] = options.replay.name
+    print(results.format())
+    if options.save_baseline:
+        report.save_baseline(summary, options.save_baseline)
+    if options.baseline:
+        problems = report.regressions(summary, report.load_baseline(options.baseline), options.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Concurrent downloads of one submission PDF through gunicorn (WSGI, threaded workers) and uvicorn
+(ASGI). Run with `python -m bench.concurrency --help`.
+
+Both servers get the same number of worker processes, a throwaway SQLite database and media
+directory, and DEBUG off. Every download is a separate connection from one asyncio client, so the
+client can hold all of them open at once; --read-delay makes them slow readers, which is where a
+thread per download runs out first.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from .report import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+SETTINGS = """
+from cs3550.settings import *
+from cs3550 import database
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1"]
+DATABASES = database.from_environment({{}}, {database!r})
+MEDIA_ROOT = {media!r}
+CACHES = {{
+    "default": {{"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "local": {{"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "local"}},
+}}
+PERFORMANCE_SAMPLE_RATE = 0
+"""
+
+def servers(port, workers, threads):
+    python = sys.executable
+    return {
+        "wsgi": [python, "-m", "gunicorn", "cs3550.wsgi", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+                 "--worker-class", "gthread", "--threads", str(threads), "--backlog", "4096"],
+        "asgi": [python, "-m", "uvicorn", "cs3550.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", str(workers), "--backlog", "4096", "--no-access-log"],
+    }
+
+def prepare(directory, megabytes):
+    # Writes the settings module, then creates the database, a student and their submission.
+    # Returns the download path and the student's session cookie.
+    (directory / "bench_settings.py").write_text(SETTINGS.format(database=str(directory / "db.sqlite3"), media=str(directory / "media")))
+    sys.path.insert(0, str(directory))
+    os.environ["DJANGO_SETTINGS_MODULE"] = "bench_settings"
+    import django
+    django.setup()
+    from django.core.files.base import ContentFile
+    from django.core.management import call_command
+    from django.test import Client
+    from django.utils import timezone
+    from grades import models
+
+    call_command("migrate", verbosity=0)
+    student = models.User.objects.create_user("student", password="password")
+    assignment = models.Assignment.objects.create(
+        title="Homework", description="", deadline=timezone.now() + timezone.timedelta(days=1), weight=100, points=100,
+    )
+    content = b"%PDF-1.4 " + os.urandom(megabytes * 2**20)
+    submission = models.Submission.objects.create(
+        assignment=assignment, author=student, file=ContentFile(content, name="hw.pdf"), is_pdf=True,
+    )
+    client = Client()
+    client.force_login(student)
+    return submission.url, client.cookies["sessionid"].value, len(content)
+
+def wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited while starting")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server didn't start")
+
+async def download(port, path, cookie, size, read_delay):
+    # One download on its own connection; returns its duration, or None if it failed
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: sessionid={cookie}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        received = 0
+        while chunk := await reader.read(2**16):
+            received += len(chunk)
+            if read_delay:
+                await asyncio.sleep(read_delay)
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError):
+        return None
+    if not head.startswith(b"HTTP/1.1 200") or received != size:
+        return None
+    return time.perf_counter() - start
+
+async def load(port, path, cookie, size, downloads, concurrency, read_delay):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with slots:
+            return await download(port, path, cookie, size, read_delay)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited() for _ in range(downloads)))
+    return results, time.perf_counter() - start
+
+def run(name, command, port, directory, target, options):
+    environment = {**os.environ, "PYTHONPATH": os.pathsep.join([str(directory), str(ROOT)]), "DJANGO_SETTINGS_MODULE": "bench_settings"}
+    with open(directory / f"{name}.log", "w") as log:
+        process = subprocess.Popen(command, cwd=ROOT, env=environment, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            wait_for(port, process)
+            # Warm up every worker before measuring
+            asyncio.run(load(port, *target, options.workers * 4, options.workers * 4, 0))
+            results, seconds = asyncio.run(load(port, *target, options.downloads, options.concurrency, options.read_delay))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+    times = sorted(result for result in results if result is not None)
+    size = target[2]
+    print(f"{name:<6}{len(times) / seconds:>12.1f}{len(times) * size / seconds / 2**20:>10.1f}"
+          f"{percentile(times, 0.5) * 1000:>10.0f}{percentile(times, 0.95) * 1000:>10.0f}{len(results) - len(times):>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.concurrency", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=500, help="downloads in flight at once")
+    parser.add_argument("--downloads", type=int, default=1000)
+    parser.add_argument("--megabytes", type=int, default=1, help="size of the PDF")
+    parser.add_argument("--read-delay", type=float, default=0.0, help="seconds the client waits after each 64 KiB read")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32, help="threads per gunicorn worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server", choices=["wsgi", "asgi"], action="append", help="run only these (default both)")
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        target = prepare(directory, options.megabytes)
+        print(f"{'server':<6}{'dl/s':>12}{'MB/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'failed':>8}")
+        for name, command in servers(options.port, options.workers, options.threads).items():
+            if options.server is None or name in options.server:
+                run(name, command, options.port, directory, target, options)
+
+if __name__ == "__main__":
+    main()
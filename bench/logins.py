@@ -0,0 +1,127 @@
+"""
+Login throughput of each password hasher. Run with `python -m bench.logins --help`.
+
+A burst of clients posts to the login page in parallel threads while one logged-in client keeps
+loading the index, as at the start of an exam. Logins per core divides the logins by the CPU
+time the process used, so it doesn't depend on how many cores the machine has; "rehash" stores
+PBKDF2 hashes and logs in under the configured PASSWORD_HASHERS, so every login also rehashes.
+"""
+import argparse
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cs3550.settings")
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases
+from grades.models import User
+from .report import percentile
+
+PASSWORD = "password"
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "logins"},
+    "local": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "logins-local"},
+}
+HASHERS = {
+    "pbkdf2": ["django.contrib.auth.hashers.PBKDF2PasswordHasher"],
+    "scrypt": ["grades.hashers.ScryptPasswordHasher"],
+    "argon2": ["grades.hashers.Argon2PasswordHasher"],
+    "rehash": settings.PASSWORD_HASHERS,
+}
+
+def burst(usernames, logins, clients):
+    # Logs in `logins` times from `clients` threads; returns login and index latencies and statuses
+    latencies, index_latencies, statuses = [], [], []
+    done = threading.Event()
+    jobs = iter(range(logins))
+    lock = threading.Lock()
+
+    def log_in():
+        client = Client()
+        while True:
+            with lock:
+                number = next(jobs, None)
+            if number is None:
+                break
+            start = time.perf_counter()
+            response = client.post("/profile/login/", {"username": usernames[number % len(usernames)], "password": PASSWORD})
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                statuses.append(response.status_code)
+        connections.close_all()
+
+    def browse():
+        client = Client()
+        client.force_login(User.objects.get(username=usernames[0]))
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/")
+            index_latencies.append(time.perf_counter() - start)
+        connections.close_all()
+
+    browser = threading.Thread(target=browse)
+    browser.start()
+    threads = [threading.Thread(target=log_in) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    browser.join()
+    return sorted(latencies), sorted(index_latencies), statuses
+
+def run(name, usernames, options):
+    stored = HASHERS["pbkdf2"] if name == "rehash" else HASHERS[name]
+    with override_settings(PASSWORD_HASHERS=stored):
+        User.objects.filter(username__in=usernames).update(password=make_password(PASSWORD))
+    with override_settings(PASSWORD_HASHERS=HASHERS[name]):
+        cpu, wall = time.process_time(), time.perf_counter()
+        latencies, index_latencies, statuses = burst(usernames, options.logins, options.clients)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    succeeded = statuses.count(302)
+    algorithms = {identify_hasher(password).algorithm for password in User.objects.filter(username__in=usernames).values_list("password", flat=True)}
+    print(f"{name:<8}{succeeded / wall:>10.1f}{succeeded / cpu:>10.1f}{cpu / max(succeeded, 1) * 1000:>10.1f}"
+          f"{percentile(latencies, 0.5) * 1000:>10.0f}{percentile(latencies, 0.95) * 1000:>10.0f}"
+          f"{percentile(index_latencies, 0.95) * 1000:>12.0f}{statuses.count(503):>6}  {','.join(sorted(algorithms))}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.logins", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16, help="logins in flight at once")
+    parser.add_argument("--login-workers", type=int, default=settings.LOGIN_WORKERS, help="LOGIN_WORKERS for the run")
+    parser.add_argument("--login-queue", type=int, default=settings.LOGIN_QUEUE, help="LOGIN_QUEUE for the run")
+    parser.add_argument("--hasher", choices=list(HASHERS), action="append", help="hashers to run (default all available)")
+    options = parser.parse_args(argv)
+    names = options.hasher or [name for name in HASHERS if name != "argon2" or importlib.util.find_spec("argon2")]
+
+    # A throwaway database file, since the clients run in threads with their own connections
+    directory = tempfile.TemporaryDirectory()
+    connections["default"].settings_dict["TEST"]["NAME"] = os.path.join(directory.name, "logins.sqlite3")
+    setup_test_environment(debug=False)
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"], PERFORMANCE_SAMPLE_RATE=0, CACHES=CACHES,
+            LOGIN_WORKERS=options.login_workers, LOGIN_QUEUE=options.login_queue,
+        ):
+            usernames = [f"student{number}" for number in range(options.users)]
+            User.objects.bulk_create(User(username=username) for username in usernames)
+            print(f"{os.cpu_count()} cores, {options.clients} clients, {options.login_workers} login threads")
+            print(f"{'hasher':<8}{'login/s':>10}{'per core':>10}{'cpu ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'index p95':>12}{'503s':>6}  stored")
+            for name in names:
+                run(name, usernames, options)
+    finally:
+        teardown_databases(databases, verbosity=0)
+        directory.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Run the test suite or the benchmark against a throwaway local PostgreSQL server, which listens
+only on a Unix socket in a temporary directory, so no network or existing server is needed.
+
+    python -m bench.postgres test [manage.py test arguments]
+    python -m bench.postgres bench [python -m bench arguments]
+
+`bench` runs the benchmark once on SQLite and once on PostgreSQL to compare them. The server
+binaries are found through pg_config, or in PG_BIN if set; initdb refuses to run as root.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import quote
+
+def binaries():
+    directory = os.environ.get("PG_BIN")
+    if not directory and shutil.which("pg_config"):
+        directory = subprocess.check_output(["pg_config", "--bindir"], text=True).strip()
+    if not directory or not os.path.exists(os.path.join(directory, "initdb")):
+        sys.exit("PostgreSQL server binaries not found; set PG_BIN to the directory holding initdb")
+    return lambda name: os.path.join(directory, name)
+
+@contextmanager
+def local_server(durable=True):
+    # Yields a DATABASE_URL for a new cluster; durable=False turns off fsync, which is fine for tests
+    command = binaries()
+    with tempfile.TemporaryDirectory(prefix="lms-pg-") as directory:
+        data = os.path.join(directory, "data")
+        subprocess.run([command("initdb"), "-D", data, "-U", "lms", "--auth=trust", "-E", "UTF8"], check=True, stdout=subprocess.DEVNULL)
+        settings = f"-k {directory} -c listen_addresses=''" + ("" if durable else " -c fsync=off -c synchronous_commit=off")
+        subprocess.run([command("pg_ctl"), "-D", data, "-l", os.path.join(directory, "server.log"), "-o", settings, "-w", "start"], check=True, stdout=subprocess.DEVNULL)
+        try:
+            subprocess.run([command("createdb"), "-h", directory, "-U", "lms", "lms"], check=True)
+            yield f"postgres://lms@/lms?host={quote(directory)}"
+        finally:
+            subprocess.run([command("pg_ctl"), "-D", data, "-m", "fast", "-w", "stop"], stdout=subprocess.DEVNULL)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("test", "bench"):
+        sys.exit(__doc__)
+    action, arguments = argv[0], argv[1:]
+    environ = {name: value for name, value in os.environ.items() if not name.startswith("DATABASE_")}
+
+    if action == "test":
+        with local_server(durable=False) as url:
+            sys.exit(subprocess.run([sys.executable, "manage.py", "test", *arguments], env={**environ, "DATABASE_URL": url}).returncode)
+
+    print("SQLite", flush=True)
+    subprocess.run([sys.executable, "-m", "bench", *arguments], env=environ, check=True)
+    with local_server() as url:
+        print("\nPostgreSQL", flush=True)
+        subprocess.run([sys.executable, "-m", "bench", *arguments], env={**environ, "DATABASE_URL": url}, check=True)
+
+if __name__ == "__main__":
+    main()
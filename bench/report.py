@@ -0,0 +1,112 @@
+import json
+import math
+import os
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Latency changes smaller than this are noise no matter what the tolerance says
+SLACK_MS = 1.0
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+def rss_mb():
+    # Resident set size now, falling back to the peak where /proc isn't available
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+class Report:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.templates = defaultdict(list)
+        self.sizes = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.rss = {}
+
+    def record(self, page, seconds, queries, status, template_seconds=0.0, size=0):
+        self.sizes[page].append(size)
+        self.templates[page].append(template_seconds * 1000)
+        self.latencies[page].append(seconds * 1000)
+        self.queries[page].append(queries)
+        self.statuses[page][status] += 1
+
+    def summary(self):
+        pages = {}
+        for page, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            pages[page] = {
+                "count": len(latencies),
+                "p50": round(percentile(latencies, 0.50), 3),
+                "p95": round(percentile(latencies, 0.95), 3),
+                "p99": round(percentile(latencies, 0.99), 3),
+                "queries": round(sum(self.queries[page]) / len(latencies), 2),
+                # The queries even a fully cached request costs
+                "min_queries": min(self.queries[page]),
+                "max_queries": max(self.queries[page]),
+                "template_ms": round(sum(self.templates[page]) / len(latencies), 3),
+                # Response body, before any compression
+                "kb": round(sum(self.sizes[page]) / len(latencies) / 1024, 1),
+                "statuses": dict(self.statuses[page]),
+            }
+        count = sum(len(latencies) for latencies in self.latencies.values())
+        seconds = sum(sum(latencies) for latencies in self.latencies.values()) / 1000
+        return {"pages": pages, "requests_per_second": round(count / seconds, 1) if seconds else 0.0, "rss_mb": {name: round(value, 1) for name, value in self.rss.items()}}
+
+    def format(self):
+        summary = self.summary()
+        lines = [f"{'page':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'min q':>7}{'tpl ms':>9}{'KB':>8}  statuses"]
+        for page, row in summary["pages"].items():
+            statuses = " ".join(f"{status}x{count}" for status, count in sorted(row["statuses"].items()))
+            lines.append(f"{page:<18}{row['count']:>7}{row['p50']:>10.2f}{row['p95']:>10.2f}{row['p99']:>10.2f}{row['queries']:>9.1f}{row['min_queries']:>7}{row['template_ms']:>9.2f}{row['kb']:>8.1f}  {statuses}")
+        lines.append(f"{summary['requests_per_second']:.1f} requests per second from one client")
+        lines.append("RSS " + ", ".join(f"{name} {value:.1f} MB" for name, value in summary["rss_mb"].items()))
+        return "\n".join(lines)
+
+def save_baseline(summary, path):
+    with open(path, "w") as file:
+        json.dump(summary, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)
+
+def regressions(summary, baseline, tolerance=0.5):
+    """
+    Compare a run against a stored baseline. Query counts are deterministic, so any increase is a
+    regression; p95 latency and peak RSS may grow by `tolerance` (a fraction) before they count.
+    """
+    if summary.get("config") != baseline.get("config"):
+        return [f"baseline was recorded with {baseline.get('config')}, not {summary.get('config')}"]
+    problems = []
+    for page, row in summary["pages"].items():
+        before = baseline["pages"].get(page)
+        if before is None:
+            continue
+        if row["queries"] > before["queries"]:
+            problems.append(f"{page}: {row['queries']} queries per request, baseline {before['queries']}")
+        limit = before["p95"] * (1 + tolerance) + SLACK_MS
+        if row["p95"] > limit:
+            problems.append(f"{page}: p95 {row['p95']:.2f} ms, baseline {before['p95']:.2f} ms (limit {limit:.2f} ms)")
+    peak, before_peak = summary["rss_mb"].get("peak"), baseline.get("rss_mb", {}).get("peak")
+    if peak and before_peak and peak > before_peak * (1 + tolerance):
+        problems.append(f"peak RSS {peak:.1f} MB, baseline {before_peak:.1f} MB")
+    return problems
@@ -0,0 +1,40 @@
+import time
+from django.test import Client
+from grades import pagination, performance
+from grades.models import User
+from . import report
+
+def run(requests, warmup=0):
+    # One logged-in client per user, so sessions and cookies behave like separate browsers
+    clients = {}
+    results = report.Report()
+    performance.instrument_templates()
+    for number, request in enumerate(requests):
+        client = clients.get(request.user)
+        if client is None:
+            client = clients[request.user] = Client()
+            client.force_login(User.objects.get(username=request.user))
+            # As main.js sets it, so tables start with a page like they do in a browser
+            client.cookies[pagination.COOKIE] = "1"
+
+        # Counts queries on every connection, since reads may go to the replica, and times templates
+        measurement = performance.Measurement()
+        token = performance.current.set(measurement)
+        with measurement.record(performance.all_connections()):
+            start = time.perf_counter()
+            if request.method == "POST":
+                response = client.post(request.path, request.data)
+            else:
+                response = client.get(request.path, request.data)
+            # Downloads stream, so read them to the end before stopping the clock; the test
+            # client closes the response once they're exhausted
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = time.perf_counter() - start
+        performance.current.reset(token)
+
+        if number >= warmup:
+            results.record(request.page, elapsed, measurement.queries, response.status_code, measurement.template_time, size)
+    return results
@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+from django.utils import timezone
+import makedata
+from grades.models import Assignment, Submission
+
+@dataclass
+class Dataset:
+    admin: str = ""
+    tas: list = field(default_factory=list)
+    students: list = field(default_factory=list)
+    open_assignments: list = field(default_factory=list)
+    closed_assignments: list = field(default_factory=list)
+    # (assignment id, author username, grader username) for every submission
+    submissions: list = field(default_factory=list)
+
+def seed(students=200, tas=4, assignments=10, submission_rate=0.8, graded_rate=0.5, seed=0):
+    # Fill an empty database with makedata's synthetic course and note who and what is in it
+    makedata.scaled_data(students, tas, assignments, submission_rate, graded_rate, blobs=10, seed=seed, log=lambda message: None)
+    now = timezone.now()
+    dataset = Dataset(admin="admin", tas=[f"ta{i}" for i in range(tas)], students=[f"student{i}" for i in range(students)])
+    for assignment_id, deadline in Assignment.objects.order_by("id").values_list("id", "deadline"):
+        (dataset.open_assignments if deadline > now else dataset.closed_assignments).append(assignment_id)
+    dataset.submissions = list(Submission.objects.order_by("id").values_list("assignment_id", "author__username", "grader__username"))
+    return dataset
@@ -0,0 +1,88 @@
+"""
+Concurrent read/write throughput of SQLite with Django's default settings and with the settings
+from cs3550/database.py. Run with `python -m bench.sqlite --help`.
+
+Each worker is its own process, like a WSGI worker. Writers run the read-then-write transactions
+an upload does (look at a row, update it, insert another); readers run an aggregate query.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from cs3550 import database
+
+SCHEMA = """
+CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE event (id INTEGER PRIMARY KEY, counter INTEGER NOT NULL, value INTEGER NOT NULL);
+INSERT INTO counter (id, value) VALUES (1, 0), (2, 0), (3, 0), (4, 0);
+"""
+
+def configs(path):
+    return {
+        "default": {"default": {"ENGINE": database.ENGINE, "NAME": path}},
+        "tuned": {"default": database.sqlite(path), "replica": database.sqlite(path, read_only=True)},
+    }
+
+def worker(job):
+    role, number, databases, seconds = job
+    from django.conf import settings
+    settings.configure(DATABASES=databases, DATABASE_ROUTERS=[], INSTALLED_APPS=[], USE_TZ=True)
+    import django
+    django.setup()
+    from django.db import OperationalError, connections, transaction
+
+    alias = "replica" if role == "reader" and "replica" in databases else "default"
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if role == "writer":
+                with transaction.atomic(), connections[alias].cursor() as cursor:
+                    row = number % 4 + 1
+                    cursor.execute("SELECT value FROM counter WHERE id = %s", [row])
+                    [value] = cursor.fetchone()
+                    cursor.execute("UPDATE counter SET value = %s WHERE id = %s", [value + 1, row])
+                    cursor.execute("INSERT INTO event (counter, value) VALUES (%s, %s)", [row, value])
+            else:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT counter, COUNT(*), MAX(value) FROM event GROUP BY counter")
+                    cursor.fetchall()
+            done += 1
+        except OperationalError:
+            # "database is locked": the request this stands for would have failed
+            errors += 1
+            connections[alias].close()
+    return role, done, errors
+
+def run(name, databases, path, writers, readers, seconds):
+    with sqlite3.connect(path) as connection:
+        connection.executescript(SCHEMA)
+    jobs = [("writer", i, databases, seconds) for i in range(writers)] + [("reader", i, databases, seconds) for i in range(readers)]
+    # Spawned, so each worker configures Django from scratch
+    with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+        results = pool.map(worker, jobs)
+    totals = {}
+    for role, done, errors in results:
+        done_before, errors_before = totals.get(role, (0, 0))
+        totals[role] = (done_before + done, errors_before + errors)
+    writes, write_errors = totals.get("writer", (0, 0))
+    reads, read_errors = totals.get("reader", (0, 0))
+    print(f"{name:<10}{writes / seconds:>12.0f}{write_errors:>9}{reads / seconds:>12.0f}{read_errors:>9}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.sqlite", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    options = parser.parse_args(argv)
+
+    print(f"{'settings':<10}{'writes/s':>12}{'failed':>9}{'reads/s':>12}{'failed':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ["default", "tuned"]:
+            path = os.path.join(directory, f"{name}.sqlite3")
+            run(name, configs(path)[name], path, options.writers, options.readers, options.seconds)
+
+if __name__ == "__main__":
+    main()
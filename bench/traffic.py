@@ -0,0 +1,102 @@
+import json
+import random
+from dataclasses import dataclass, field
+from django.core.files.base import ContentFile
+from grades import gradebook, uploads
+from grades.models import Submission
+import makedata
+
+@dataclass
+class Request:
+    page: str
+    user: str
+    method: str
+    path: str
+    data: dict = field(default_factory=dict)
+
+def index(dataset, rng):
+    return Request("index", rng.choice(dataset.students), "GET", "/")
+
+def student_assignment(dataset, rng):
+    assignment_id = rng.choice(dataset.open_assignments + dataset.closed_assignments)
+    return Request("assignment", rng.choice(dataset.students), "GET", f"/{assignment_id}/")
+
+def ta_assignment(dataset, rng):
+    assignment_id = rng.choice(dataset.open_assignments + dataset.closed_assignments)
+    return Request("assignment", rng.choice(dataset.tas), "GET", f"/{assignment_id}/")
+
+def upload(dataset, rng):
+    # Resubmissions mostly, since a student's first upload to an assignment only happens once
+    assignment_id = rng.choice(dataset.open_assignments)
+    file = ContentFile(makedata.synthetic_pdf(rng.random(), 0), name="homework.pdf")
+    return Request("assignment POST", rng.choice(dataset.students), "POST", f"/{assignment_id}/", {uploads.FIELD_NAME: file})
+
+def submissions(dataset, rng):
+    assignment_id = rng.choice(dataset.closed_assignments)
+    return Request("submissions", rng.choice(dataset.tas), "GET", f"/{assignment_id}/submissions")
+
+def admin_submissions(dataset, rng):
+    assignment_id = rng.choice(dataset.closed_assignments)
+    return Request("submissions", dataset.admin, "GET", f"/{assignment_id}/submissions")
+
+def submission_rows(dataset, rng):
+    # A grader re-sorting the table; only the first page, as scrolling further is rarer
+    assignment_id = rng.choice(dataset.closed_assignments)
+    sort = rng.choice(list(gradebook.SUBMISSION_SORTS))
+    return Request("submission_rows", dataset.admin, "GET", f"/{assignment_id}/submissions/rows", {"sort": sort, "order": rng.choice(["asc", "desc"])})
+
+def student_profile(dataset, rng):
+    return Request("profile", rng.choice(dataset.students), "GET", "/profile/")
+
+def ta_profile(dataset, rng):
+    return Request("profile", rng.choice(dataset.tas), "GET", "/profile/")
+
+def profile_rows(dataset, rng):
+    sort = rng.choice(list(gradebook.STUDENT_SORTS))
+    return Request("profile_rows", rng.choice(dataset.students), "GET", "/profile/rows", {"sort": sort, "order": rng.choice(["asc", "desc"])})
+
+def statistics(dataset, rng):
+    return Request("statistics", dataset.admin, "GET", "/profile/statistics")
+
+def show_upload(dataset, rng):
+    # Resubmitting changes the key, so look up the current one
+    assignment_id, author, grader = rng.choice(dataset.submissions)
+    key = Submission.objects.filter(assignment_id=assignment_id, author__username=author).values_list("key", flat=True).get()
+    return Request("show_upload", grader or dataset.admin, "GET", f"/uploads/{key}")
+
+# Weighted mixes of the requests above; `deadline` is the 11:59 PM rush, `grading` the morning after
+MIXES = {
+    "deadline": [
+        (30, student_assignment), (25, upload), (20, student_profile), (15, index), (5, ta_assignment), (5, show_upload),
+    ],
+    "grading": [
+        (30, submissions), (30, show_upload), (15, ta_profile), (10, ta_assignment), (5, admin_submissions), (5, submission_rows), (5, statistics),
+    ],
+    "browse": [
+        (25, index), (25, student_assignment), (15, student_profile), (5, profile_rows), (10, ta_profile), (10, submissions), (10, show_upload),
+    ],
+}
+
+def generate(dataset, mix, count, seed=0):
+    rng = random.Random(seed)
+    weights, makers = zip(*MIXES[mix])
+    for maker in rng.choices(makers, weights, k=count):
+        yield maker(dataset, rng)
+
+def replay(file):
+    """
+    Read recorded traffic, one JSON object per line, like
+        {"user": "student3", "method": "GET", "path": "/profile/", "page": "profile"}
+    Only GET and form-encoded POST requests (a "data" object) can be replayed.
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        yield Request(
+            entry.get("page", entry["path"]),
+            entry["user"],
+            entry.get("method", "GET").upper(),
+            entry["path"],
+            entry.get("data", {}),
+        )
@@ -3,14 +3,32 @@ ASGI config for cs3550 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The views that mostly wait on I/O (show_upload, the submission page and profile) are async, so
+under an ASGI server a download in progress holds a coroutine instead of a worker thread. Run it
+with one of (the uvicorn[standard] extras add uvloop and httptools, which roughly halve uvicorn's
+per-request overhead):
+
+    uvicorn cs3550.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+    gunicorn cs3550.asgi:application -k uvicorn.workers.UvicornWorker --workers 4
+    daphne -b 0.0.0.0 -p 8000 cs3550.asgi:application
+
+Under WSGI (gunicorn cs3550.wsgi --worker-class gthread --threads 32) the same views run through
+async_to_sync and files go out with sendfile, which is cheaper per request; ASGI pays off when many
+clients download large files slowly, or with DOWNLOAD_BACKEND left at "django". Compare the two on
+your hardware with `python -m bench.concurrency`.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.apps import apps
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cs3550.settings')
 
 application = get_asgi_application()
+
+# Compile the templates before the first request instead of during it
+apps.get_app_config('grades').warm_templates()
@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
+from . import database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,11 +44,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'grades.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'grades.middleware.RoleMiddleware',
+    'grades.middleware.LoginBusyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,8 +62,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process, in development too (it reloads on changes);
+            # cs3550/wsgi.py and asgi.py warm it up at startup
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -74,12 +87,10 @@ WSGI_APPLICATION = 'cs3550.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# SQLite in WAL mode with a read-only connection for reads, or PostgreSQL with a connection pool
+# when DATABASE_URL is set; see cs3550/database.py for the other DATABASE_* variables
+DATABASES = database.from_environment(os.environ, BASE_DIR / 'db.sqlite3')
+DATABASE_ROUTERS = ['cs3550.database.ReadWriteRouter']
 
 
 # Password validation
@@ -117,7 +128,12 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = 'static/'
-STATICFILES_DIRS = [ 'static/' ]
+# `manage.py buildstatic` writes the bundled and minified main.js and main.css here; without DEBUG
+# they're collected instead of the sources in static/
+STATIC_BUILD_DIR = BASE_DIR / 'build' / 'static'
+STATICFILES_DIRS = [ 'static/' ] if DEBUG else [ STATIC_BUILD_DIR, 'static/' ]
+# collectstatic copies the files here, under content-hashed names with .gz/.br copies (see STORAGES)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -125,5 +141,97 @@ STATICFILES_DIRS = [ 'static/' ]
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_ROOT = 'uploads/'
+# Uploads are stored once per distinct content; see grades.storage. A file freed within a minute of
+# being written is left behind, and only `manage.py collect_uploads` deletes it, so run that on a
+# schedule (nightly from cron, say)
+STORAGES = {
+    'default': {
+        'BACKEND': 'grades.storage.ContentAddressedStorage',
+    },
+    # Hashed names, so grades.staticfiles.serve (or the front proxy) can let browsers cache them for good
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG else 'grades.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 MEDIA_URL = 'uploads/'
-LOGIN_URL = '/profile/login/'
\ No newline at end of file
+
+# "default" is shared by every worker: a directory of files, or Redis when REDIS_URL is set.
+# "local" keeps each process's own copy of entries from it; see grades/caching.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+LOGIN_URL = '/profile/login/'
+
+# How new submissions are given to TAs: "least-loaded", "round-robin" or "weighted"
+# With "weighted", GRADER_CAPACITY maps TA usernames to their share of the load (default 1)
+GRADER_POLICY = "least-loaded"
+GRADER_CAPACITY = {}
+
+
+# Seconds to cache each user's groups across requests (None to look them up once per request)
+# The cache must be shared by every worker, since group changes only invalidate it in-process
+ROLE_CACHE_TIMEOUT = None
+
+# Sessions are read from the "default" cache and only hit the database on a miss;
+# "django.contrib.sessions.backends.signed_cookies" keeps them in the cookie instead and skips both
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# New passwords are hashed with the first of these; the rest only check existing hashes. A hash from
+# another hasher, or with other parameters, is redone with the first when its user next logs in.
+# Argon2 needs argon2-cffi; without it new passwords use scrypt
+PASSWORD_HASHERS = [
+    'grades.hashers.Argon2PasswordHasher',
+    'grades.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if importlib.util.find_spec('argon2') is None:
+    PASSWORD_HASHERS.remove('grades.hashers.Argon2PasswordHasher')
+
+# Costs of the hashers above, in place of Django's defaults; python -m bench.logins measures them.
+# Argon2id at OWASP's minimum (19 MiB, 2 passes, 1 lane); scrypt keeps Django's (16 MiB)
+PASSWORD_HASHER_PARAMETERS = {
+    'argon2': {'time_cost': 2, 'memory_cost': 19 * 1024, 'parallelism': 1},
+}
+
+# Threads per worker process that check passwords, and logins that may wait for one before the
+# login page answers 503; keeps a burst of logins from taking every CPU from the other views
+LOGIN_WORKERS = 2
+LOGIN_QUEUE = 32
+
+# Loads the logged-in user from the "default" cache instead of the database on every request
+AUTHENTICATION_BACKENDS = ['grades.backends.CachedModelBackend']
+# Seconds a logged-in user stays cached (None to load them from the database every request)
+USER_CACHE_TIMEOUT = 60 * 60
+
+# How submission downloads are sent: "django" streams them from the worker, "x-accel" (nginx) and
+# "x-sendfile" (Apache, lighttpd) let the front proxy send the file from MEDIA_ROOT instead
+DOWNLOAD_BACKEND = "django"
+# With "x-accel", the internal nginx location that aliases MEDIA_ROOT
+DOWNLOAD_ACCEL_PREFIX = "/protected-uploads/"
+
+# Fraction of requests grades.middleware.PerformanceMiddleware measures (0 to turn it off); each
+# measured request costs a little extra, so keep this around 0.01 in production
+PERFORMANCE_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON object per measured request, plus periodic per-view summaries
+        'grades.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from grades import views
+from grades import staticfiles, views
 
 # We decide which function to run based on the URL
 urlpatterns = [
@@ -24,8 +24,15 @@ urlpatterns = [
     path("", views.index),
     path("<int:assignment_id>/", views.assignment),
     path("<int:assignment_id>/submissions", views.submissions),
+    path("<int:assignment_id>/submissions/rows", views.submission_rows),
     path("profile/", views.profile),
+    path("profile/grades", views.grades),
+    path("profile/rows", views.profile_rows),
+    path("profile/statistics", views.statistics),
+    path("gradebook/export", views.export_gradebook),
     path("profile/login/", views.login_form),
     path("profile/logout/", views.logout_form),
     path('uploads/<str:filename>', views.show_upload),
+    # Collected static files, for when nothing in front of Django serves them
+    path('static/<path:path>', staticfiles.serve),
 ]
@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.apps import apps
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cs3550.settings')
 
 application = get_wsgi_application()
+
+# Compile the templates before the first request instead of during it
+apps.get_app_config('grades').warm_templates()
@@ -1,6 +1,20 @@
+import os
 from django.apps import AppConfig
+from django.template.loader import get_template
 
 
 class GradesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'grades'
+
+    def ready(self):
+        from . import signals
+
+    def warm_templates(self):
+        # Compile every template into the cached loader, so the first requests don't have to. Called
+        # from cs3550/wsgi.py and asgi.py rather than ready(), so manage.py commands don't pay for it
+        directory = os.path.join(self.path, "templates")
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(".html"):
+                    get_template(os.path.relpath(os.path.join(root, file), directory))
@@ -0,0 +1,54 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from . import logins
+
+def cache_key(user_id):
+    return f"user:{user_id}"
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user, which AuthenticationMiddleware calls on every request, reads the
+    user from the cache for USER_CACHE_TIMEOUT seconds. Saving or deleting a user drops the entry
+    (see grades/signals.py), so password changes still log other sessions out.
+
+    Passwords are checked in the bounded thread pool from grades/logins.py.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            logins.waste_time(password)
+            return None
+        if logins.check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, "USER_CACHE_TIMEOUT", None)
+        if timeout is None:
+            return super().get_user(user_id)
+        user = cache.get(cache_key(user_id))
+        if user is None:
+            # Inactive users come back as None and aren't cached; deactivating one saves it
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(cache_key(user_id), user, timeout)
+        return user
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
+
+def invalidate(user_id):
+    # Now, so this transaction reads its own change, and after the commit, in case another
+    # request cached the old row in between
+    cache.delete(cache_key(user_id))
+    transaction.on_commit(lambda: cache.delete(cache_key(user_id)))
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import Counter
+from django.core.cache import caches
+from django.db import transaction
+from . import performance
+
+# Versions of the data cached entries are built from; changing one orphans every entry built from it
+ASSIGNMENTS = "assignments"
+SUBMISSIONS = "submissions"
+
+def scores(assignment_id):
+    # Version of one assignment's grades, so a new grade only orphans entries built from that assignment
+    return f"scores:{assignment_id}"
+
+# Seconds an entry lives; versions make entries safe to keep until evicted, so this only bounds memory
+TIMEOUT = 24 * 60 * 60
+
+class Metrics:
+    # Hits and misses per entry name, for this process
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def count(self, name, outcome):
+        with self.lock:
+            self.counts[name, outcome] += 1
+        measurement = performance.current.get()
+        if measurement is not None:
+            measurement.cache[outcome] += 1
+
+    def snapshot(self):
+        with self.lock:
+            names = {name for name, _ in self.counts}
+            return {
+                name: {
+                    "hits": self.counts[name, "hit"],
+                    "misses": self.counts[name, "miss"],
+                    "hit_rate": round(self.counts[name, "hit"] / (self.counts[name, "hit"] + self.counts[name, "miss"]), 3),
+                }
+                for name in sorted(names)
+            }
+
+metrics = Metrics()
+
+def shared():
+    # Visible to every worker, so invalidations reach all of them
+    return caches["default"]
+
+def local():
+    # This process's copy of shared entries, which saves unpickling them on every request
+    return caches["local"]
+
+def version_key(name):
+    return f"version:{name}"
+
+def versions(*names):
+    # Current version of each name; one that was never bumped (or was evicted) starts from the clock,
+    # so it can't come back to a number some stale entry was stored under
+    keys = [version_key(name) for name in names]
+    found = shared().get_many(keys)
+    for key in keys:
+        if key not in found:
+            shared().add(key, time.time_ns(), timeout=None)
+            found[key] = shared().get(key)
+    return [found[key] for key in keys]
+
+def bump(*names):
+    def increment():
+        for name in names:
+            try:
+                shared().incr(version_key(name))
+            except ValueError:
+                shared().set(version_key(name), time.time_ns(), timeout=None)
+    # Bumping before the commit would let another request cache the old rows under the new version
+    transaction.on_commit(increment)
+
+def get_or_set(name, depends_on, compute, vary=()):
+    """
+    Cached result of compute(), stored under name, the current versions of depends_on and vary
+    (like a user id). Checks this process's cache first, then the shared one.
+    """
+    key = ":".join(map(str, [name, *versions(*depends_on), *vary]))
+    value = local().get(key)
+    if value is None:
+        value = shared().get(key)
+        if value is None:
+            metrics.count(name, "miss")
+            value = compute()
+            shared().set(key, value, TIMEOUT)
+        else:
+            metrics.count(name, "hit")
+        local().set(key, value, TIMEOUT)
+    else:
+        metrics.count(name, "hit")
+    return value
+
+def clear():
+    shared().clear()
+    local().clear()
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Q
+from . import models, roles
+
+# Denormalized counts read by the assignment page, kept in step with the submission table
+STUDENTS = "students"
+
+def derived():
+    # Counters recomputed from the submission table; anything else (like the scheduler's turns) is left alone
+    return Q(name=STUDENTS) | Q(name__startswith="assignment:") | Q(name__startswith="grader:")
+
+def submissions_key(assignment_id):
+    return f"assignment:{assignment_id}:submissions"
+
+def graded_key(assignment_id):
+    return f"assignment:{assignment_id}:graded"
+
+def grader_prefix(grader_id):
+    return f"grader:{grader_id}:"
+
+def assigned_key(assignment_id, grader_id):
+    return f"{grader_prefix(grader_id)}{assignment_id}:assigned"
+
+def grader_graded_key(assignment_id, grader_id):
+    return f"{grader_prefix(grader_id)}{assignment_id}:graded"
+
+def get(*names):
+    # Missing rows count as zero
+    values = dict(models.Counter.objects.filter(name__in=names).values_list("name", "value"))
+    return [values.get(name, 0) for name in names]
+
+def add(deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    with transaction.atomic():
+        for name, delta in deltas.items():
+            if not models.Counter.objects.filter(name=name).update(value=F("value") + delta):
+                models.Counter.objects.bulk_create([models.Counter(name=name)], ignore_conflicts=True)
+                models.Counter.objects.filter(name=name).update(value=F("value") + delta)
+
+def create(names):
+    # Make sure rows exist so compare_and_swap has something to compare against
+    models.Counter.objects.bulk_create([models.Counter(name=name) for name in names], ignore_conflicts=True)
+
+def compare_and_swap(name, old, new):
+    return models.Counter.objects.filter(name=name, value=old).update(value=new) == 1
+
+def put(name, value):
+    models.Counter.objects.update_or_create(name=name, defaults={"value": value})
+
+def state_deltas(old, new):
+    deltas = defaultdict(int)
+    for state, sign in [(old, -1), (new, 1)]:
+        if state is None:
+            continue
+        assignment_id, grader_id, graded = state
+        deltas[submissions_key(assignment_id)] += sign
+        if graded:
+            deltas[graded_key(assignment_id)] += sign
+        if grader_id is not None:
+            deltas[assigned_key(assignment_id, grader_id)] += sign
+            if graded:
+                deltas[grader_graded_key(assignment_id, grader_id)] += sign
+    return deltas
+
+def sync(submissions):
+    # Apply whatever changed since each submission was loaded or last synced
+    deltas = defaultdict(int)
+    for submission in submissions:
+        new_state = submission.counter_state()
+        for name, delta in state_deltas(submission._counted, new_state).items():
+            deltas[name] += delta
+        submission._counted = new_state
+    add(deltas)
+
+def discard(submission):
+    add(state_deltas(submission._counted or submission.counter_state(), None))
+    submission._counted = None
+
+def count_students():
+    put(STUDENTS, models.User.objects.filter(groups__name=roles.STUDENTS).count())
+
+def forget_grader(grader_id):
+    models.Counter.objects.filter(name__startswith=grader_prefix(grader_id)).delete()
+
+def expected(apps=global_apps):
+    # Recompute every counter from scratch; apps may be a migration's historical registry
+    User = apps.get_model("auth", "User")
+    Submission = apps.get_model("grades", "Submission")
+    counts = defaultdict(int)
+    counts[STUDENTS] = User.objects.filter(groups__name=roles.STUDENTS).count()
+    rows = Submission.objects.values("assignment_id", "grader_id").annotate(
+        submissions=Count("id"),
+        graded=Count("id", filter=Q(score__isnull=False)),
+    )
+    for row in rows:
+        assignment_id, grader_id = row["assignment_id"], row["grader_id"]
+        counts[submissions_key(assignment_id)] += row["submissions"]
+        counts[graded_key(assignment_id)] += row["graded"]
+        if grader_id is not None:
+            counts[assigned_key(assignment_id, grader_id)] += row["submissions"]
+            counts[grader_graded_key(assignment_id, grader_id)] += row["graded"]
+    return {name: value for name, value in counts.items() if value}
+
+def drift():
+    # Every counter whose stored value disagrees with the submission table, as name -> (stored, expected)
+    stored = dict(models.Counter.objects.filter(derived()).values_list("name", "value"))
+    actual = expected()
+    return {
+        name: (stored.get(name, 0), actual.get(name, 0))
+        for name in stored.keys() | actual.keys()
+        if stored.get(name, 0) != actual.get(name, 0)
+    }
+
+def rebuild(apps=global_apps):
+    Counter = apps.get_model("grades", "Counter")
+    counts = expected(apps)
+    with transaction.atomic():
+        Counter.objects.filter(derived()).delete()
+        Counter.objects.bulk_create([Counter(name=name, value=value) for name, value in counts.items()])
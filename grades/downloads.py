@@ -0,0 +1,103 @@
+import asyncio
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+# Each async read is a hop to a worker thread, so they're bigger; one is buffered per download
+ASYNC_CHUNK_SIZE = 256 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def etag(fieldfile):
+    # Storage names never get reused for different content, so name, size and mtime identify it
+    modified = fieldfile.storage.get_modified_time(fieldfile.name).timestamp()
+    return quote_etag(f"{fieldfile.size:x}-{int(modified * 1000000):x}")
+
+def parse_range(header, size):
+    # Only single byte ranges are supported; returns (start, end) inclusive, or None if unsatisfiable
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+def read_range(file, start, end):
+    with file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+async def aread_range(file, start, end):
+    # Reads happen in worker threads, so one download doesn't hold up the event loop
+    try:
+        await asyncio.to_thread(file.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(file.read, min(ASYNC_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+def serve(request, fieldfile, content_type, filename=None, tag=None):
+    """
+    Send a stored file without loading it into memory. Depending on DOWNLOAD_BACKEND the file is
+    streamed by Django ("django", which lets the WSGI server use sendfile) or handed to the front
+    proxy with X-Accel-Redirect ("x-accel", nginx) or X-Sendfile ("x-sendfile", Apache/lighttpd).
+    Under ASGI Django streams the file from an async iterator, since a plain file iterator would
+    be read into memory whole before sending.
+    """
+    tag = quote_etag(tag) if tag else etag(fieldfile)
+    if tag in parse_etags(request.headers.get("If-None-Match", "")):
+        return HttpResponseNotModified(headers={"ETag": tag})
+
+    backend = getattr(settings, "DOWNLOAD_BACKEND", "django")
+    size = fieldfile.size
+    if backend == "x-accel":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_PREFIX + quote(fieldfile.name)
+    elif backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = fieldfile.path
+    else:
+        requested = request.headers.get("Range")
+        start, end, status = 0, size - 1, 200
+        # A stale If-Range means the client's partial copy is out of date, so send everything
+        if requested and request.headers.get("If-Range", tag) == tag:
+            byte_range = parse_range(requested, size)
+            if byte_range is None:
+                return HttpResponse(status=416, headers={"Content-Range": f"bytes */{size}"})
+            (start, end), status = byte_range, 206
+
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(aread_range(fieldfile.open("rb"), start, end), status=status, content_type=content_type)
+            response["Content-Length"] = end - start + 1
+        elif status == 206:
+            response = StreamingHttpResponse(read_range(fieldfile.open("rb"), start, end), status=status, content_type=content_type)
+            response["Content-Length"] = end - start + 1
+        else:
+            response = FileResponse(fieldfile.open("rb"), content_type=content_type)
+        if status == 206:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Accept-Ranges"] = "bytes"
+
+    response["ETag"] = tag
+    response["Content-Disposition"] = content_disposition_header(True, filename or os.path.basename(fieldfile.name))
+    return response
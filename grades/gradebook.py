@@ -0,0 +1,120 @@
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Now, NullIf
+from django.utils import timezone
+from . import counters, models, pagination
+
+# Orders of the paginated tables (see grades/pagination.py); sort keys can't be NULL, so missing
+# scores count as -1
+BY_AUTHOR = {"author_last_name": F("author__last_name"), "author_first_name": F("author__first_name")}
+SUBMISSION_SORTS = {
+    "author": pagination.Sort(**BY_AUTHOR),
+    "score": pagination.Sort(sort_score=Coalesce("score", Value(-1.0))),
+    "status": pagination.Sort(graded=Case(When(score__isnull=True, then=0), default=1), **BY_AUTHOR),
+}
+# For student_assignments()
+STUDENT_SORTS = {
+    "assignment": pagination.Sort(),
+    "score": pagination.Sort(sort_grade=Coalesce(F("score") / Cast("points", FloatField()), Value(-1.0))),
+    # Same order as the statuses in assignment_status(): missing, not due, ungraded, graded
+    "status": pagination.Sort(sort_status=Case(
+        When(submitted=True, score__isnull=False, then=3),
+        When(submitted=True, then=2),
+        When(deadline__gte=Now(), then=1),
+        default=0,
+    )),
+}
+# For assignment_summaries(), where the score is the fraction graded
+SUMMARY_SORTS = {
+    "assignment": pagination.Sort(),
+    "score": pagination.Sort(sort_graded=Coalesce(
+        Cast("graded_count", FloatField()) / NullIf(Cast("submissions_count", FloatField()), Value(0.0)), Value(0.0),
+    )),
+}
+
+def student_assignments(user):
+    # One query: every assignment, in id order, annotated with this student's submission (if any)
+    own_submissions = models.Submission.objects.filter(assignment=OuterRef("pk"), author=user).order_by("id")
+    return models.Assignment.objects.only("id", "title", "deadline", "weight", "points").order_by("id").annotate(
+        submitted=Exists(own_submissions),
+        score=Subquery(own_submissions.values("score")[:1]),
+    )
+
+def assignment_status(assignment, submitted, score, now):
+    """
+    1. Submitted and graded - Show score (score on submission divided by maximum points in assignment)
+    2. Submitted but not yet graded - Mark as 'Ungraded'
+    3. Not submitted because the assignment isn't due yet - Mark as 'Not Due'
+    4. Missing because the assignment is past due - Mark as 'Missing'
+
+    Returns the status along with the grade (a fraction, or None if it doesn't count yet)
+    """
+    if submitted:
+        if score is not None:
+            grade = score / assignment.points
+            return f"{grade * 100}%", grade
+        return "Ungraded", None
+    if assignment.deadline < now:
+        return "Missing", 0
+    return "Not Due", None
+
+def format_grade(earned_points, available_points):
+    return "100.0%" if available_points == 0 else f"{round((earned_points / available_points) * 100, 1)}%"
+
+def grade_assignments(assignments, scores, now):
+    # scores maps the id of every assignment the student submitted to its score (None if ungraded)
+    rows = []
+    for assignment in assignments:
+        status, grade = assignment_status(assignment, assignment.id in scores, scores.get(assignment.id), now)
+        rows.append({
+            "id": assignment.id,
+            "title": assignment.title,
+            "status": status,
+            "grade": grade,
+            "weight": assignment.weight
+        })
+
+    return rows, format_grade(*weighted_points(rows))
+
+def weighted_points(rows):
+    # Earned and available points over the rows that count towards the grade, from grade_assignments()
+    earned_points = 0
+    available_points = 0
+    for row in rows:
+        if row["grade"] is not None:
+            earned_points += row["grade"] * row["weight"]
+            available_points += row["weight"]
+    return earned_points, available_points
+
+def student_grades(user, now=None):
+    return grade_student_assignments(list(student_assignments(user)), now)
+
+async def astudent_grades(user, now=None):
+    return grade_student_assignments([assignment async for assignment in student_assignments(user)], now)
+
+def grade_student_assignments(assignments, now=None):
+    # assignments come from student_assignments()
+    scores = {assignment.id: assignment.score for assignment in assignments if assignment.submitted}
+    return grade_assignments(assignments, scores, now or timezone.now())
+
+def assignment_summaries(grader=None):
+    # One grouped query: submission counts for every assignment, optionally only those assigned to grader
+    assigned = Q() if grader is None else Q(submission__grader=grader)
+    return models.Assignment.objects.only("id", "title").annotate(
+        submissions_count=Count("submission", filter=assigned),
+        graded_count=Count("submission", filter=assigned & Q(submission__score__isnull=False)),
+    ).order_by("id")
+
+def assignment_summary(assignment, grader=None):
+    # Same counts for a single assignment, read from the materialized counters in one query
+    submissions_count, graded_count, for_grading_count, students_count = counters.get(
+        counters.submissions_key(assignment.id),
+        counters.graded_key(assignment.id),
+        counters.assigned_key(assignment.id, grader.id if grader else None),
+        counters.STUDENTS,
+    )
+    return {
+        "submissions_count": submissions_count,
+        "graded_count": graded_count,
+        "for_grading_count": for_grading_count,
+        "students_count": students_count,
+    }
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+
+class ConfiguredHasher:
+    # Takes its cost parameters from PASSWORD_HASHER_PARAMETERS[algorithm] instead of Django's defaults
+    def __init__(self):
+        for name, value in getattr(settings, "PASSWORD_HASHER_PARAMETERS", {}).get(self.algorithm, {}).items():
+            if not hasattr(self, name):
+                raise ImproperlyConfigured(f"{type(self).__name__} has no parameter {name!r}")
+            setattr(self, name, value)
+
+class Argon2PasswordHasher(ConfiguredHasher, hashers.Argon2PasswordHasher):
+    pass
+
+class ScryptPasswordHasher(ConfiguredHasher, hashers.ScryptPasswordHasher):
+    pass
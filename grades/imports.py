@@ -0,0 +1,105 @@
+import csv
+import io
+import math
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from . import caching, counters, models, stats
+
+CHUNK_SIZE = 500
+
+def read_rows(file, columns):
+    # Accepts an uploaded file (bytes) or a text file
+    text = file.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in columns if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing column{'s' if len(missing) != 1 else ''}: {', '.join(missing)}")
+    return list(reader)
+
+def parse_score(value, points):
+    value = (value or "").strip()
+    if value == "":
+        return None
+    try:
+        score = float(value)
+    except ValueError:
+        score = math.nan
+    if not math.isfinite(score):
+        raise ValueError("Score value must be a valid number.")
+    if score < 0 or score > points:
+        raise ValueError(f"Score {score} is not in valid range 0-{points}.")
+    return score
+
+def import_grades(file, user, assignment=None):
+    """
+    Applies a CSV of grades with `username` and `score` columns, plus an `assignment` column
+    (assignment id) unless a single assignment is given. All rows are validated in one pass and
+    their submissions looked up with one query; then the valid rows are saved in chunked bulk
+    updates. Returns how many submissions were updated and a list of (line, error) pairs.
+    """
+    columns = ["username", "score"] if assignment is not None else ["assignment", "username", "score"]
+    try:
+        rows = read_rows(file, columns)
+    except UnicodeDecodeError:
+        return 0, [(1, "File is not a UTF-8 CSV.")]
+    except (ValueError, csv.Error) as e:
+        return 0, [(1, str(e))]
+
+    errors = []
+    if assignment is not None:
+        assignments = {assignment.id: assignment}
+    else:
+        assignments = models.Assignment.objects.only("id", "points").in_bulk()
+
+    # Validate every row in memory
+    parsed = []
+    for line, row in enumerate(rows, start=2):
+        try:
+            assignment_id = assignment.id if assignment is not None else int(row.get("assignment") or "")
+        except ValueError:
+            errors.append((line, "Assignment must be a valid assignment ID."))
+            continue
+        if assignment_id not in assignments:
+            errors.append((line, f"Assignment {assignment_id} does not exist."))
+            continue
+        try:
+            score = parse_score(row.get("score"), assignments[assignment_id].points)
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+        parsed.append((line, assignment_id, (row.get("username") or "").strip(), score))
+
+    # Resolve every (assignment, username) pair with one query; oldest first, so a student's newest submission wins
+    assignment_ids = {assignment_id for _, assignment_id, _, _ in parsed}
+    found = {
+        (submission.assignment_id, submission.author.username): submission
+        for submission in models.Submission.objects.filter(assignment_id__in=assignment_ids)
+            .select_related("author").only("id", "assignment_id", "grader_id", "score", "author__username")
+            .order_by("id")
+    }
+
+    changed = {}
+    for line, assignment_id, username, score in parsed:
+        submission = found.get((assignment_id, username))
+        if submission is None:
+            errors.append((line, f"No submission from '{username}' for assignment {assignment_id}."))
+            continue
+        try:
+            submission.change_grade(user, score)
+        except PermissionDenied as e:
+            errors.append((line, str(e)))
+            continue
+        changed[submission.id] = submission
+
+    changed = list(changed.values())
+    for start in range(0, len(changed), CHUNK_SIZE):
+        chunk = changed[start:start + CHUNK_SIZE]
+        with transaction.atomic():
+            models.Submission.objects.bulk_update(chunk, ["score"])
+            counters.sync(chunk)
+            caching.bump(caching.SUBMISSIONS)
+            stats.invalidate(chunk)
+
+    return len(changed), sorted(errors)
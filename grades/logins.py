@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+
+class Busy(Exception):
+    # Every login thread is hashing and LOGIN_QUEUE more logins are already waiting for one
+    pass
+
+class Pool:
+    """
+    A fixed number of threads for password hashing. However many logins arrive at once, at most
+    `workers` hashes run in parallel, so the rest of the process's threads keep some CPU for
+    other views; past `queue` waiting logins, new ones fail fast with Busy instead of piling up.
+    """
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="login")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise Busy()
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+pools = {}
+lock = threading.Lock()
+
+def pool():
+    # Made on first use; a change to the settings (in tests) gets its own
+    key = (settings.LOGIN_WORKERS, settings.LOGIN_QUEUE)
+    with lock:
+        if key not in pools:
+            pools[key] = Pool(*key)
+        return pools[key]
+
+def verify(password, encoded):
+    # Whether password matches, and a new hash for it if encoded is out of date
+    correct, must_update = hashers.verify_password(password, encoded)
+    return correct, hashers.make_password(password) if correct and must_update else None
+
+def check_password(user, password):
+    """
+    user.check_password(password) with the hashing done in the pool. A hash made by another hasher,
+    or with other parameters, is replaced with one from the first of PASSWORD_HASHERS.
+    """
+    correct, rehashed = pool().run(verify, password, user.password)
+    if rehashed:
+        # Saved from the request's thread, which has its database connection
+        user.password = rehashed
+        user.save(update_fields=["password"])
+    return correct
+
+def waste_time(password):
+    # A login for a username that doesn't exist costs as much as one that does
+    pool().run(hashers.make_password, password)
@@ -0,0 +1,37 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from grades import models
+
+BATCH_SIZE = 500
+
+class Command(BaseCommand):
+    # Submissions delete the files they stop using once they commit, but not a file written within
+    # the storage's GRACE_SECONDS, like one released and uploaded again right away; this is the only
+    # thing that deletes those, so it should run on a schedule
+    help = "Delete stored submission files that no submission refers to any more (run it on a schedule)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be deleted")
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, "collect"):
+            raise CommandError("The default storage doesn't deduplicate files; nothing to collect")
+
+        orphans = []
+        names = []
+        for name in default_storage.walk():
+            names.append(name)
+            if len(names) == BATCH_SIZE:
+                orphans += self.unreferenced(names)
+                names = []
+        orphans += self.unreferenced(names)
+
+        for name in orphans:
+            self.stdout.write(name)
+            if not options["dry_run"]:
+                default_storage.collect(name)
+        self.stdout.write(self.style.SUCCESS(f"{len(orphans)} unreferenced file{'s' if len(orphans) != 1 else ''}"))
+
+    def unreferenced(self, names):
+        referenced = set(models.Submission.objects.filter(file__in=names).values_list("file", flat=True))
+        return [name for name in names if name not in referenced]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from grades import export
+
+class Command(BaseCommand):
+    help = "Write every student's grades on every assignment as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-o", "--output", help="File to write to (default: standard output)")
+
+    def handle(self, *args, **options):
+        if options["output"]:
+            with open(options["output"], "w", newline="") as file:
+                export.write_csv(export.gradebook_rows(), file)
+        else:
+            export.write_csv(export.gradebook_rows(), self.stdout)
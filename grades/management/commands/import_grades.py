@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from grades import imports, models
+
+class Command(BaseCommand):
+    help = "Import grades from a CSV with assignment, username and score columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="CSV file to import")
+        parser.add_argument("--user", required=True, help="Username to grade as; must be an admin or the submissions' grader")
+        parser.add_argument("--assignment", type=int, help="Assignment ID, if the file has no assignment column")
+
+    def handle(self, *args, **options):
+        try:
+            user = models.User.objects.get(username=options["user"])
+            assignment = models.Assignment.objects.get(id=options["assignment"]) if options["assignment"] else None
+        except (models.User.DoesNotExist, models.Assignment.DoesNotExist) as e:
+            raise CommandError(e)
+
+        with open(options["file"], newline="") as file:
+            updated, errors = imports.import_grades(file, user, assignment=assignment)
+
+        for line, error in errors:
+            self.stderr.write(f"Line {line}: {error}")
+        self.stdout.write(self.style.SUCCESS(f"{updated} grade{'s' if updated != 1 else ''} imported"))
+        if errors:
+            raise CommandError(f"{len(errors)} row{'s' if len(errors) != 1 else ''} could not be imported")
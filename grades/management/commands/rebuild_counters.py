@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from grades import counters
+
+class Command(BaseCommand):
+    help = "Rebuild the submission counters from the submission table, or check them for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report drift; exit with an error if there is any")
+
+    def handle(self, *args, **options):
+        drift = counters.drift()
+        for name, (stored, expected) in sorted(drift.items()):
+            self.stdout.write(f"{name}: stored {stored}, expected {expected}")
+
+        if options["check"]:
+            if drift:
+                raise CommandError(f"{len(drift)} counter{'s' if len(drift) != 1 else ''} out of date")
+            self.stdout.write(self.style.SUCCESS("Counters are up to date"))
+        else:
+            counters.rebuild()
+            self.stdout.write(self.style.SUCCESS("Counters rebuilt"))
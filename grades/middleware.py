@@ -0,0 +1,135 @@
+import itertools
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+from . import caching, logins, performance, roles
+
+class SyncAndAsyncMiddleware:
+    # Runs in whichever mode the rest of the stack does, so async views under ASGI stay on the event loop
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+class RoleMiddleware(SyncAndAsyncMiddleware):
+    # Attaches request.roles, loading the user's groups at most once per request, and
+    # request.aroles() for async views, the way request.auser() goes with request.user
+    def handle(self, request):
+        self.attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.attach(request)
+        return await self.get_response(request)
+
+    def attach(self, request):
+        request.roles = SimpleLazyObject(lambda: roles.get_roles(request.user))
+
+        async def aroles():
+            if not hasattr(request, "_aroles"):
+                request._aroles = await sync_to_async(roles.get_roles)(await request.auser())
+            return request._aroles
+        request.aroles = aroles
+
+class LoginBusyMiddleware(SyncAndAsyncMiddleware):
+    # A login that finds the password pool full (grades.logins.Busy) gets a 503 from whichever view
+    # called authenticate(), /admin/login/ included; the login page shows its own message instead
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, logins.Busy):
+            response = HttpResponse("Too many people are logging in right now. Try again in a few seconds.", status=503, content_type="text/plain")
+            response["Retry-After"] = 5
+            return response
+        return None
+
+class PerformanceMiddleware(SyncAndAsyncMiddleware):
+    """
+    Measures a PERFORMANCE_SAMPLE_RATE fraction of requests: wall time, query count and time,
+    template render time, response size, repeated statements and cache hits. Each measured
+    response gets a Server-Timing header and a JSON line on the grades.performance logger, and
+    per-view histograms and cache hit rates are logged every SUMMARY_EVERY measured requests.
+    Put it first in MIDDLEWARE so the other middleware's queries count too.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.measured = itertools.count(1)
+        performance.instrument_templates()
+
+    def sampled(self):
+        rate = getattr(settings, "PERFORMANCE_SAMPLE_RATE", 0)
+        return rate > 0 and random.random() < rate
+
+    def handle(self, request):
+        if not self.sampled():
+            return self.get_response(request)
+        measurement = performance.Measurement()
+        token = performance.current.set(measurement)
+        try:
+            with measurement.record(performance.all_connections()):
+                response = self.get_response(request)
+        finally:
+            performance.current.reset(token)
+        return self.report(request, response, measurement)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        measurement = performance.Measurement()
+        token = performance.current.set(measurement)
+        # The ORM runs in the request's sync thread, whose connections aren't the event loop's
+        recording = await sync_to_async(lambda: measurement.record(performance.all_connections()))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+            performance.current.reset(token)
+        return self.report(request, response, measurement)
+
+    def report(self, request, response, measurement):
+        # Streaming responses are produced after this, so only their setup is measured
+        total_ms = (time.perf_counter() - measurement.started) * 1000
+        db_ms = measurement.query_time * 1000
+        template_ms = measurement.template_time * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.2f};desc="{measurement.queries} queries"',
+            f"tpl;dur={template_ms:.2f}",
+            f"total;dur={total_ms:.2f}",
+        ])
+        view = request.resolver_match.view_name if request.resolver_match else None
+        duplicates = measurement.duplicates(performance.DUPLICATE_THRESHOLD)
+        performance.log({
+            "event": "request",
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 3),
+            "db_ms": round(db_ms, 3),
+            "queries": measurement.queries,
+            "template_ms": round(template_ms, 3),
+            "bytes": response.get("Content-Length") if response.streaming else len(response.content),
+            "duplicates": duplicates,
+            "cache_hits": measurement.cache["hit"],
+            "cache_misses": measurement.cache["miss"],
+        })
+        performance.histograms.add(view, total_ms, measurement.queries)
+        if next(self.measured) % performance.SUMMARY_EVERY == 0:
+            performance.log({"event": "summary", "views": performance.histograms.snapshot(reset=True), "cache": caching.metrics.snapshot()})
+        return response
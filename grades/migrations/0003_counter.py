@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+def build_counters(apps, schema_editor):
+    from grades import counters
+    counters.rebuild(apps)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0002_alter_submission_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+def check_existing_files(apps, schema_editor):
+    from grades.uploads import is_pdf, PDF_MAGIC
+    Submission = apps.get_model("grades", "Submission")
+    for submission in Submission.objects.iterator():
+        try:
+            with submission.file.open("rb") as file:
+                first_chunk = file.read(len(PDF_MAGIC))
+        except (FileNotFoundError, ValueError):
+            continue
+        if is_pdf(submission.file.name, first_chunk):
+            submission.is_pdf = True
+            submission.save(update_fields=["is_pdf"])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0003_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='is_pdf',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(check_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+def copy_file_names(apps, schema_editor):
+    Submission = apps.get_model("grades", "Submission")
+    for submission in Submission.objects.only("id", "file").iterator():
+        submission.key = submission.file.name
+        submission.save(update_fields=["key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0004_submission_is_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='key',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(copy_file_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='submission',
+            name='key',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'author'], name='grades_subm_assignm_9ba332_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'grader'], name='grades_subm_assignm_f38f81_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'score'], name='grades_subm_assignm_f3e971_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+def hash_existing_files(apps, schema_editor):
+    from grades.uploads import file_sha256
+    Submission = apps.get_model("grades", "Submission")
+    for submission in Submission.objects.iterator():
+        try:
+            with submission.file.open("rb") as file:
+                submission.sha256 = file_sha256(file)
+        except (FileNotFoundError, ValueError):
+            continue
+        submission.save(update_fields=["sha256"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0005_submission_key_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(hash_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0006_submission_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='file',
+            field=models.FileField(db_index=True, upload_to=''),
+        ),
+    ]
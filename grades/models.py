@@ -1,6 +1,17 @@
-from django.db import models
+import os
+from django.db import models, transaction
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import PermissionDenied
+from django.utils.crypto import get_random_string
+from . import uploads
+
+# Longest download key; uploaded names can be this long already, before the random suffix
+KEY_LENGTH = 255
+
+def unique_key(name):
+    root, extension = os.path.splitext(name)
+    suffix = f"_{get_random_string(7)}{extension}"[:KEY_LENGTH]
+    return root[:KEY_LENGTH - len(suffix)] + suffix
 
 class Assignment(models.Model):
     title = models.CharField(max_length=200)
@@ -13,15 +24,74 @@ class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     grader = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="graded_set")
-    file = models.FileField(blank=False)
+    file = models.FileField(blank=False, db_index=True)
     score = models.FloatField(null=True)
+    # Whether the file passed the PDF check when it was uploaded
+    is_pdf = models.BooleanField(default=False)
+    # Unique name the file is downloaded under, /uploads/<key>
+    key = models.CharField(max_length=KEY_LENGTH, unique=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["assignment", "author"]),
+            models.Index(fields=["assignment", "grader"]),
+            models.Index(fields=["assignment", "score"]),
+        ]
+
+    # The (assignment, grader, graded) state the counters currently reflect, None if not counted yet
+    _counted = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        submission = super().from_db(db, field_names, values)
+        if {"assignment_id", "grader_id", "score"} <= submission.__dict__.keys():
+            submission._counted = submission.counter_state()
+        submission._stored_file = submission.__dict__.get("file")
+        return submission
+
+    def save(self, *args, **kwargs):
+        # Identical uploads share one stored file, so each submission gets its own download key
+        if self.file and not self.file._committed:
+            self.sha256 = uploads.file_sha256(self.file.file)
+            self.key = unique_key(os.path.basename(self.file.name))
+            self.file.save(self.file.name, self.file.file, save=False)
+        elif not self.key:
+            # Made from a file that's already stored, like a copy of another submission's
+            self.key = unique_key(os.path.basename(self.file.name) or "submission")
+        super().save(*args, **kwargs)
+
+        # The file it replaced may now be unused
+        stored_file = getattr(self, "_stored_file", None)
+        if stored_file and stored_file != self.file.name:
+            self.release_file(stored_file)
+        self._stored_file = self.file.name
+
+    def release_file(self, name):
+        # Once the transaction commits, delete the stored file if no submission refers to it any more
+        storage = self.file.storage
+        def collect():
+            if hasattr(storage, "collect") and not Submission.objects.filter(file=name).exists():
+                storage.collect(name)
+        transaction.on_commit(collect)
+
+    @property
+    def url(self):
+        return self.file.storage.url(self.key)
+
+    def counter_state(self):
+        return (self.assignment_id, self.grader_id, self.score is not None)
 
     def change_grade(self, user, new_score):
-        if not user.is_superuser and user != self.grader:
+        if not user.is_superuser and user.id != self.grader_id:
             raise PermissionDenied("Only admins and TA's can change grades")
         self.score = new_score
 
     def view_submission(self, user):
-        if user != self.author and user != self.grader and not user.is_superuser:
+        if user.id not in (self.author_id, self.grader_id) and not user.is_superuser:
             raise PermissionDenied("Only admins, the author or the grader of this submission can view this file")
-        return self.file
\ No newline at end of file
+        return self.file
+
+class Counter(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
@@ -0,0 +1,84 @@
+from django.core import signing
+from django.db.models import Q
+
+# Rows per page, and the most a client may ask for with ?limit=
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SALT = "grades.pagination"
+# main.js sets this cookie, so a page can start its tables with one page and let it fetch the rest;
+# without it, as without JavaScript, they're rendered whole
+COOKIE = "paged_tables"
+
+class InvalidPage(Exception):
+    pass
+
+class Sort:
+    """
+    An order for a table: annotations (name=expression) compared in turn, then the row id, so each
+    row has its own position and a page can start right after the last row of the previous one.
+    The expressions must not be NULL, since rows are compared with = and <.
+    """
+    def __init__(self, **keys):
+        self.keys = keys
+
+def encode(values):
+    return signing.dumps(values, salt=SALT, compress=True)
+
+def decode(cursor, length):
+    try:
+        values = signing.loads(cursor, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidPage("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidPage("Invalid cursor")
+    return values
+
+def after(names, values, descending):
+    # Rows past the cursor in the sort order: (a, b, id) > (va, vb, vid), spelled out
+    lookup = "lt" if descending else "gt"
+    condition = Q()
+    for position, name in enumerate(names):
+        condition |= Q(**dict(zip(names[:position], values[:position])), **{f"{name}__{lookup}": values[position]})
+    return condition
+
+def paged(request):
+    return request.COOKIES.get(COOKIE) == "1"
+
+def ordered(queryset, sort, descending=False):
+    # queryset in the order sort gives, with its keys annotated
+    names = [*sort.keys, "id"]
+    return queryset.annotate(**sort.keys).order_by(*[f"-{name}" if descending else name for name in names])
+
+def paginate(queryset, sort, descending=False, cursor=None, limit=None):
+    """
+    One page of queryset in the order sort gives, starting after cursor (None for the first page).
+    Returns the rows and the cursor of the next page, or None after the last one. Unlike OFFSET,
+    the database seeks straight to the cursor however deep the page is.
+    """
+    limit = limit or PAGE_SIZE
+    names = [*sort.keys, "id"]
+    queryset = ordered(queryset, sort, descending)
+    if cursor:
+        queryset = queryset.filter(after(names, decode(cursor, len(names)), descending))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode([getattr(rows[limit - 1], name) for name in names])
+
+def first_page(rows, key, limit=None):
+    # Like paginate() with an empty Sort, for rows already loaded in id order; key gives a row's id
+    limit = limit or PAGE_SIZE
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode([key(rows[limit - 1])])
+
+def page(request, queryset, sorts, default):
+    # paginate() with the sort, order, cursor and limit from the query string
+    name = request.GET.get("sort", default)
+    if name not in sorts:
+        raise InvalidPage(f"Can't sort by {name!r}")
+    try:
+        limit = min(max(int(request.GET.get("limit", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise InvalidPage("limit must be a number")
+    return paginate(queryset, sorts[name], request.GET.get("order") == "desc", request.GET.get("after"), limit)
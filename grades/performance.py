@@ -0,0 +1,117 @@
+import bisect
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.db import connections
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger("grades.performance")
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the last bucket is unbounded
+BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+# A statement run this many times in one request is reported as a likely N+1 query
+DUPLICATE_THRESHOLD = 3
+# Log the aggregated histograms after this many sampled requests
+SUMMARY_EVERY = 100
+NUMBER_RE = re.compile(r"\b\d+\b")
+
+# The measurement for the request being handled, if it was sampled
+current = contextvars.ContextVar("performance", default=None)
+
+def normalize(sql):
+    # Queries differing only in literal numbers (like "IN (1, 2, 3)") count as the same query
+    return NUMBER_RE.sub("?", sql)
+
+class Measurement:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        # Hits and misses of grades.caching entries
+        self.cache = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # A connection.execute_wrapper that counts and times every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[normalize(sql)] += 1
+
+    def duplicates(self, threshold):
+        # Statements run `threshold` or more times in one request, usually a query inside a loop
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+    def record(self, connections):
+        stack = ExitStack()
+        for connection in connections:
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+class Histograms:
+    """
+    Per-view latency histograms and totals, shared by every request the process handles so they
+    can be logged periodically instead of per request.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view, milliseconds, queries):
+        with self.lock:
+            stats = self.views.setdefault(view, {"count": 0, "total_ms": 0.0, "queries": 0, "buckets": [0] * (len(BUCKETS) + 1)})
+            stats["count"] += 1
+            stats["total_ms"] += milliseconds
+            stats["queries"] += queries
+            stats["buckets"][bisect.bisect_left(BUCKETS, milliseconds)] += 1
+
+    def snapshot(self, reset=False):
+        with self.lock:
+            views = {
+                view: {
+                    "count": stats["count"],
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "queries_per_request": round(stats["queries"] / stats["count"], 2),
+                    "buckets": dict(zip([f"le_{bound}" for bound in BUCKETS] + ["inf"], stats["buckets"])),
+                }
+                for view, stats in self.views.items()
+            }
+            if reset:
+                self.views = {}
+            return views
+
+histograms = Histograms()
+
+def all_connections():
+    return [connections[alias] for alias in connections]
+
+def log(record):
+    logger.info(json.dumps(record, sort_keys=True))
+
+def instrument_templates():
+    # Time Template.render for the DjangoTemplates backend; includes and extends happen inside it
+    render = django_backend.Template.render
+    if getattr(render, "instrumented", False):
+        return
+
+    def timed_render(self, context=None, request=None):
+        measurement = current.get()
+        if measurement is None:
+            return render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            measurement.template_time += time.perf_counter() - start
+
+    timed_render.instrumented = True
+    django_backend.Template.render = timed_render
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+
+TEACHING_ASSISTANTS = "Teaching Assistants"
+STUDENTS = "Students"
+
+class Roles:
+    def __init__(self, user, groups):
+        self.is_superuser = user.is_superuser
+        self.groups = frozenset(groups)
+
+    @property
+    def is_ta(self):
+        return TEACHING_ASSISTANTS in self.groups
+
+    @property
+    def is_student(self):
+        return STUDENTS in self.groups
+
+def cache_key(user_id):
+    return f"roles:{user_id}"
+
+def group_names(user):
+    if not user.is_authenticated:
+        return []
+    # Cached across requests only when ROLE_CACHE_TIMEOUT is set; use a cache shared by every worker
+    timeout = getattr(settings, "ROLE_CACHE_TIMEOUT", None)
+    if timeout is None:
+        return list(user.groups.values_list("name", flat=True))
+    names = cache.get(cache_key(user.id))
+    if names is None:
+        names = list(user.groups.values_list("name", flat=True))
+        cache.set(cache_key(user.id), names, timeout)
+    return names
+
+def get_roles(user):
+    return Roles(user, group_names(user))
+
+def invalidate(user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db import transaction
+from . import counters, models, roles
+
+# How many times to retry when another upload grabs the grader we picked first
+ATTEMPTS = 10
+
+def round_robin_key(assignment_id):
+    return f"scheduler:{assignment_id}:turn"
+
+def least_loaded(assignment_id, graders, loads):
+    return min(graders, key=lambda grader: (loads[grader.id], grader.id))
+
+def weighted(assignment_id, graders, loads):
+    # Like least_loaded, but a TA with capacity 2 takes twice as many submissions as one with capacity 1
+    capacity = getattr(settings, "GRADER_CAPACITY", {})
+    return min(graders, key=lambda grader: (loads[grader.id] / capacity.get(grader.username, 1), grader.id))
+
+def round_robin(assignment_id, graders, loads):
+    name = round_robin_key(assignment_id)
+    counters.create([name])
+    for _ in range(ATTEMPTS):
+        [turn] = counters.get(name)
+        if counters.compare_and_swap(name, turn, turn + 1):
+            return graders[turn % len(graders)]
+    return least_loaded(assignment_id, graders, loads)
+
+POLICIES = {
+    "least-loaded": least_loaded,
+    "weighted": weighted,
+    "round-robin": round_robin,
+}
+
+def teaching_assistants():
+    return list(models.User.objects.filter(groups__name=roles.TEACHING_ASSISTANTS).only("id", "username").order_by("id"))
+
+def assign(submission, policy=None):
+    """
+    Give a saved, unassigned submission a grader. Loads come from the assigned counters, and the
+    chosen grader's counter is bumped with a compare-and-swap, so two simultaneous uploads that
+    both pick the same TA can't both succeed; the loser re-reads the loads and picks again.
+    """
+    policy = POLICIES[policy or getattr(settings, "GRADER_POLICY", "least-loaded")]
+    graders = teaching_assistants()
+    if not graders:
+        return None
+
+    assignment_id = submission.assignment_id
+    names = {grader.id: counters.assigned_key(assignment_id, grader.id) for grader in graders}
+    counters.create(names.values())
+
+    with transaction.atomic():
+        for _ in range(ATTEMPTS):
+            loads = dict(zip(names, counters.get(*names.values())))
+            grader = policy(assignment_id, graders, loads)
+            name = names[grader.id]
+            if policy is round_robin:
+                # The turn counter already serialized the choice
+                counters.add({name: 1})
+                break
+            if counters.compare_and_swap(name, loads[grader.id], loads[grader.id] + 1):
+                break
+        else:
+            # Still racing after every attempt; keep the last pick rather than fail the upload
+            counters.add({name: 1})
+
+        models.Submission.objects.filter(id=submission.id).update(grader=grader)
+        submission.grader = grader
+        submission._counted = submission.counter_state()
+    return grader
@@ -0,0 +1,50 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from . import backends, caching, counters, models, roles, stats
+
+@receiver(post_save, sender=models.Submission)
+def submission_saved(sender, instance, **kwargs):
+    counters.sync([instance])
+    caching.bump(caching.SUBMISSIONS)
+    stats.invalidate([instance])
+
+@receiver(post_delete, sender=models.Submission)
+def submission_deleted(sender, instance, **kwargs):
+    counters.discard(instance)
+    caching.bump(caching.SUBMISSIONS)
+    stats.invalidate([instance])
+    instance.release_file(instance.file.name)
+
+@receiver(post_save, sender=models.Assignment)
+@receiver(post_delete, sender=models.Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    # Scores are percentages of the points
+    caching.bump(caching.ASSIGNMENTS, caching.scores(instance.id))
+
+@receiver(m2m_changed, sender=models.User.groups.through)
+def groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        counters.count_students()
+
+    # Drop cached roles of every user whose groups changed; clears don't say who was affected
+    if action in ("post_add", "post_remove"):
+        roles.invalidate(pk_set if reverse else [instance.pk])
+    elif action == "pre_clear":
+        roles.invalidate(instance.user_set.values_list("id", flat=True) if reverse else [instance.pk])
+
+@receiver(post_save, sender=models.Group)
+@receiver(pre_delete, sender=models.Group)
+def group_changed(sender, instance, **kwargs):
+    roles.invalidate(instance.user_set.values_list("id", flat=True))
+
+@receiver(post_save, sender=models.User)
+def user_saved(sender, instance, **kwargs):
+    backends.invalidate(instance.pk)
+
+@receiver(post_delete, sender=models.User)
+def user_deleted(sender, instance, **kwargs):
+    backends.invalidate(instance.pk)
+    # Submissions they graded lose their grader without any signal being sent
+    counters.forget_grader(instance.id)
+    stats.invalidate_all()
+    counters.count_students()
@@ -0,0 +1,91 @@
+import gzip
+import mimetypes
+import os
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text files get compressed copies; images and fonts are compressed already
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".ico", ".json", ".txt")
+# Smaller files aren't worth it
+MIN_COMPRESS_SIZE = 256
+# Hashed names change whenever the content does, so browsers may keep them for good
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+CACHE_BRIEFLY = "public, max-age=300"
+# Preferred first
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage (content-hashed names, with references between files rewritten)
+    that also writes a .gz copy of each hashed text file, and a .br copy when the brotli package is
+    installed, for serve() or the front proxy to send to clients that accept them.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and hashed_name and not isinstance(processed, Exception) and hashed_name.endswith(COMPRESSIBLE):
+                self.compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def compress(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(content, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+def accepted_encodings(header):
+    # Codings named in Accept-Encoding, leaving out any refused with q=0
+    accepted = set()
+    for item in header.split(","):
+        coding, _, quality = item.partition(";")
+        try:
+            refused = float(quality.strip().removeprefix("q=") or 1) == 0
+        except ValueError:
+            refused = False
+        if not refused:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def is_hashed(path):
+    # Whether path is a content-hashed name from the manifest
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None)
+    return bool(hashed_files) and path in hashed_files.values()
+
+def serve(request, path):
+    """
+    Serve a collected static file from STATIC_ROOT, precompressed if the client accepts it, with
+    far-future caching for hashed names. A front proxy can do the same without reaching Django
+    (nginx: gzip_static, brotli_static and these Cache-Control headers on a location for STATIC_ROOT).
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not a static file")
+    if not os.path.isfile(full_path):
+        raise Http404("Not a static file")
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    encoding = next((encoding for encoding, suffix in ENCODINGS.items() if encoding in accepted and os.path.isfile(full_path + suffix)), None)
+    response = FileResponse(open(full_path + ENCODINGS.get(encoding, ""), "rb"), content_type=content_type or "application/octet-stream")
+    if encoding is not None:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = CACHE_FOREVER if is_hashed(path) else CACHE_BRIEFLY
+    return response
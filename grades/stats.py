@@ -0,0 +1,137 @@
+import math
+from collections import defaultdict
+from django.db import connections
+from django.db.models import Aggregate, Count, F, FloatField, IntegerField, Sum, Value
+from django.db.models.functions import Cast, Floor, Least
+from . import caching, models
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Percentiles reported for each distribution; the 50th is the median
+PERCENTILES = (10, 25, 50, 75, 90)
+# Histogram bars, 10 percentage points wide each; full marks go in the last one
+BUCKETS = 10
+
+class PercentileCont(Aggregate):
+    # PostgreSQL's percentile_cont, which interpolates between the closest scores like numpy.percentile
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+def score_percent(assignment):
+    # A submission's score as a percentage of the assignment's points, without joining the assignment
+    return F("score") * Value(100.0 / assignment.points)
+
+def percentiles(scores):
+    # PERCENTILES of sorted scores
+    if not scores:
+        return [None] * len(PERCENTILES)
+    if numpy is not None:
+        return numpy.percentile(scores, PERCENTILES).tolist()
+    results = []
+    for percentile in PERCENTILES:
+        position = (len(scores) - 1) * percentile / 100
+        low, high = math.floor(position), math.ceil(position)
+        results.append(scores[low] + (scores[high] - scores[low]) * (position - low))
+    return results
+
+def bucket_of(percent):
+    return min(int(percent // (100 / BUCKETS)), BUCKETS - 1)
+
+class Totals:
+    # Running sums of one group of percentages, from which its mean and spread follow exactly
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.histogram = [0] * BUCKETS
+
+    def add(self, bucket, count, total, squares):
+        self.count += count
+        self.total += total
+        self.squares += squares
+        self.histogram[bucket] += count
+
+    @classmethod
+    def of(cls, percents):
+        totals = cls()
+        if numpy is not None and percents:
+            values = numpy.asarray(percents)
+            totals.count = len(values)
+            totals.total = float(values.sum())
+            totals.squares = float(values @ values)
+            buckets = numpy.minimum(values // (100 / BUCKETS), BUCKETS - 1).astype(int)
+            totals.histogram = numpy.bincount(buckets, minlength=BUCKETS).tolist()
+        else:
+            for percent in percents:
+                totals.add(bucket_of(percent), 1, percent, percent * percent)
+        return totals
+
+    def distribution(self, percentiles):
+        mean = self.total / self.count if self.count else None
+        return {
+            "count": self.count,
+            "mean": mean,
+            # Population standard deviation
+            "stddev": None if mean is None else math.sqrt(max(self.squares / self.count - mean ** 2, 0)),
+            "median": percentiles[PERCENTILES.index(50)],
+            "percentiles": percentiles,
+            "histogram": self.histogram,
+            # Tallest bar, for scaling the others
+            "peak": max(self.histogram),
+        }
+
+def aggregate(graded):
+    # Everything in the database: sums and histograms from one grouped query, percentiles from two more
+    bucket = Least(Cast(Floor(F("percent") / Value(100.0 / BUCKETS)), IntegerField()), Value(BUCKETS - 1))
+    totals = defaultdict(Totals)
+    for grader, number, count, total, squares in graded.annotate(bucket=bucket).values_list("grader", "bucket").annotate(
+        count=Count("id"), total=Sum("percent"), squares=Sum(F("percent") * F("percent")),
+    ).order_by():
+        totals[grader].add(number, count, total, squares)
+        totals["all"].add(number, count, total, squares)
+
+    aggregates = {f"p{percentile}": PercentileCont("percent", fraction=percentile / 100) for percentile in PERCENTILES}
+    rows = [{"grader": "all", **graded.aggregate(**aggregates)}, *graded.values("grader").annotate(**aggregates).order_by()]
+    return {row["grader"]: totals[row["grader"]].distribution([row[f"p{percentile}"] for percentile in PERCENTILES]) for row in rows}
+
+def fetch(graded):
+    # One fetch of the scores, sorted (by score, which can use the (assignment, score) index), and the rest here
+    sorted_percents = defaultdict(list)
+    for grader, percent in graded.values_list("grader", "percent").order_by("score"):
+        sorted_percents[grader].append(percent)
+        sorted_percents["all"].append(percent)
+    return {grader: Totals.of(percents).distribution(percentiles(percents)) for grader, percents in sorted_percents.items()}
+
+def compute(assignment):
+    """
+    Score distributions for one assignment, in percent of its points: the whole class, and each
+    grader's share by grader id (None for submissions without one). PostgreSQL aggregates them
+    all, percentiles included; other databases can't work out percentiles, so the scores are
+    fetched once and summarized here, with NumPy when it's installed.
+    """
+    if assignment.points <= 0:
+        # Nothing to take a percentage of
+        distributions = {}
+    else:
+        graded = models.Submission.objects.filter(assignment=assignment, score__isnull=False).annotate(percent=score_percent(assignment))
+        distributions = aggregate(graded) if connections[graded.db].vendor == "postgresql" else fetch(graded)
+    return {
+        "all": distributions.pop("all", None) or Totals().distribution(percentiles([])),
+        "graders": distributions,
+    }
+
+def assignment_statistics(assignment):
+    # Cached until a grade for this assignment (or its points) changes; other assignments keep theirs
+    return caching.get_or_set("statistics", [caching.scores(assignment.id)], lambda: compute(assignment), vary=[assignment.id])
+
+def invalidate(submissions):
+    # Drop the cached statistics of the assignments these submissions belong to, once the transaction commits
+    caching.bump(*{caching.scores(submission.assignment_id) for submission in submissions})
+
+def invalidate_all():
+    # When it isn't known which assignments changed, like after a grader is deleted
+    caching.bump(*[caching.scores(assignment_id) for assignment_id in models.Assignment.objects.values_list("id", flat=True)])
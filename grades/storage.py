@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from .uploads import file_sha256
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once, named by its SHA-256 and sharded into two directory levels
+    (ab/cd/abcd....pdf), so identical uploads share one file and no directory grows too large.
+    A file is referenced by every Submission whose `file` holds its name. Once a commit drops a
+    reference, Submission deletes the file if nothing names it any more and it wasn't touched
+    within GRACE_SECONDS. Files spared that way are only deleted by `manage.py collect_uploads`,
+    which therefore has to run on a schedule.
+    """
+    # Files touched this recently may be in use by an upload that hasn't committed yet
+    GRACE_SECONDS = 60
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        # Names come from content, so an existing file is a duplicate to reuse, not a clash
+        return name
+
+    def _save(self, name, content):
+        name = self.blob_name(file_sha256(content), name)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Mark it as freshly referenced so collect() leaves it alone
+            os.utime(full_path)
+            return name
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write under a temporary name, then link into place; if a simultaneous upload of the
+        # same content wins the race, its copy is just as good
+        fd, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            if hasattr(content, "temporary_file_path"):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), temporary_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, "wb") as file:
+                    for chunk in content.chunks():
+                        file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            os.chmod(temporary_path, self.file_permissions_mode or 0o644)
+            try:
+                os.link(temporary_path, full_path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(temporary_path)
+        return name
+
+    def collect(self, name):
+        # Delete an unreferenced file unless an upload may have just reused it
+        try:
+            if time.time() - os.path.getmtime(self.path(name)) > self.GRACE_SECONDS:
+                self.delete(name)
+        except FileNotFoundError:
+            pass
+
+    def walk(self, directory=""):
+        directories, files = self.listdir(directory)
+        for file in files:
+            yield os.path.join(directory, file)
+        for subdirectory in directories:
+            yield from self.walk(os.path.join(directory, subdirectory))
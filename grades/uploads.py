@@ -0,0 +1,59 @@
+import hashlib
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+FIELD_NAME = "submission-file"
+PDF_MAGIC = b"%PDF-"
+MAX_SIZE = 64 * 1024 * 1024
+
+def is_pdf(name, first_chunk):
+    return name.endswith(".pdf") and first_chunk.startswith(PDF_MAGIC)
+
+def file_sha256(file):
+    # Uploads arrive with the digest the handler computed; anything else gets hashed here
+    if getattr(file, "sha256", None):
+        return file.sha256
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+    return digest.hexdigest()
+
+class SubmissionUploadHandler(FileUploadHandler):
+    """
+    Runs ahead of Django's own upload handlers for submission files. It rejects the upload as soon
+    as the first chunk shows it isn't a PDF or the byte count passes MAX_SIZE, instead of after the
+    whole file has been spooled to disk, and computes the file's SHA-256 as the chunks go by.
+    """
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hash = None
+        self.error = None
+        self.sha256 = None
+        self.too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # The whole body is too big to hold a small enough file; refuse it at the first file chunk
+        self.too_large = content_length > MAX_SIZE + 64 * 1024
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.hash = hashlib.sha256() if field_name == FIELD_NAME else None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.hash is None:
+            return raw_data
+        if start == 0 and not is_pdf(self.file_name, raw_data):
+            self.reject("type", "File is not a PDF")
+        if self.too_large or start + len(raw_data) > MAX_SIZE:
+            self.reject("size", "Size of file shouldn't be greater than 64 MiB")
+        self.hash.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.hash is not None:
+            self.sha256 = self.hash.hexdigest()
+        # Let the next handler build the uploaded file
+        return None
+
+    def reject(self, kind, message):
+        self.error = (kind, message)
+        raise StopUpload(connection_reset=True)
@@ -1,57 +1,69 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.models import User, Group
 from django.contrib.auth import authenticate, login, logout
-from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.utils.http import url_has_allowed_host_and_scheme
-from django.db.models import Count, Q
 from django.core.exceptions import PermissionDenied
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.utils import timezone
-from . import models
+from django.db import transaction
+from . import models, caching, counters, downloads, export, gradebook, imports, logins, pagination, scheduler, stats, uploads
 from collections import defaultdict
 
 @login_required
 def index(request):
-    assignments = models.Assignment.objects.all()
-    return render(request, "index.html", {"assignments": assignments})
+    # The table is the same for everyone, so it's rendered once per change to the assignments
+    rows = caching.get_or_set("assignment-rows", [caching.ASSIGNMENTS], lambda: render_to_string(
+        "assignment_rows.html", {"assignments": models.Assignment.objects.only("id", "title", "deadline", "weight").order_by("id")},
+    ))
+    return render(request, "index.html", {"assignment_rows": rows})
 
 @login_required
-def assignment(request, assignment_id):
+@csrf_exempt
+async def assignment(request, assignment_id):
+    # Submission files are checked while they stream in, so the handler has to be
+    # installed before the CSRF check reads the request body
+    upload = uploads.SubmissionUploadHandler(request)
+    request.upload_handlers.insert(0, upload)
+    if request.method == "POST":
+        # Parse the body (spooling and checking the file) in a worker thread, not on the event loop
+        await sync_to_async(lambda: request.POST, thread_sensitive=False)()
+    return await assignment_page(request, assignment_id, upload)
+
+@csrf_protect
+async def assignment_page(request, assignment_id, upload):
     errors = defaultdict(list)
-    user = request.user
+    user = await request.auser()
+    roles = await request.aroles()
     
-    try:
-        assignment = models.Assignment.objects.get(id=assignment_id)
-    except models.Assignment.DoesNotExist:
-        errors["assignment"].append("Assignment ID is not valid.")
-        raise Http404("Page does not exist.")
+    assignment = await sync_to_async(load_assignment)(assignment_id)
     
-    try:
-        # For Student Action Box
-        student = user
-        submission = models.Submission.objects.filter(author=student, assignment_id=assignment_id).first()
-        # For TA Action Box
-        grader = pick_grader(assignment) if submission is None else submission.grader
-    except models.User.DoesNotExist:
-        errors["user"].append("User does not exist.")
-
-    # Get the number of submissions, submissions assigned to the grader, and the number of students
-    submissions_count = assignment.submission_set.count()
-    for_grading_count = assignment.submission_set.filter(grader=grader).count()
-    students_count = models.Group.objects.get(name="Students").user_set.count()
+    # For Student Action Box
+    student = user
+    submission = await models.Submission.objects.filter(author=student, assignment_id=assignment_id).afirst()
+
+    # Get the number of submissions, submissions assigned to this TA, and the number of students
+    summary = await sync_to_async(gradebook.assignment_summary)(assignment, user)
     grade_percentage = f"{(submission.score / assignment.points) * 100}" if submission and submission.score is not None else ""
+    [assignments_version] = await sync_to_async(caching.versions)(caching.ASSIGNMENTS)
     
     additional_info = {
         "assignment": assignment,
+        # Keys the cached description, so editing the assignment replaces it
+        "assignments_version": assignments_version,
         "submission": submission,
         "past_due": assignment.deadline < timezone.now(),
-        "submissions": submissions_count,
+        "submissions": summary["submissions_count"],
         "grade_percentage": grade_percentage,
-        "for_grading": for_grading_count,
-        "students": students_count,
+        "for_grading": summary["for_grading_count"],
+        "students": summary["students_count"],
         "user": user,
-        "is_student": is_student(user),
-        "is_ta": is_ta(user),
+        "is_student": roles.is_student,
+        "is_ta": roles.is_ta,
         "errors": errors.items()
     }
 
@@ -60,61 +72,75 @@ def assignment(request, assignment_id):
             return HttpResponseBadRequest("Assignment is past due.")
 
         # Get the submitted file object
-        submitted_file = request.FILES.get("submission-file")
+        submitted_file = request.FILES.get(uploads.FIELD_NAME)
 
+        # Too large or not a PDF; the upload handler stopped receiving it
+        if upload.error:
+            kind, message = upload.error
+            errors[kind].append(message)
+            return await sync_to_async(render)(request, "assignment.html", additional_info)
 
-        if submitted_file.size > 64 * 1024 * 1024:
-            errors["size"].append("Size of file shouldn't be greater than 64 MiB")
-            return render(request, "assignment.html", additional_info)
-        
-        if not submitted_file.name.endswith(".pdf") or not next(submitted_file.chunks()).startswith(b'%PDF-'):
-            errors["type"].append("File is not a PDF")
-            return render(request, "assignment.html", additional_info)
+        if submitted_file is None:
+            errors["file"].append("No file was submitted")
+            return await sync_to_async(render)(request, "assignment.html", additional_info)
+        submitted_file.sha256 = upload.sha256
 
+        await sync_to_async(save_submission)(submission, assignment, student, submitted_file)
+        return redirect(f"/{assignment_id}/")
+    
+    return await sync_to_async(render)(request, "assignment.html", additional_info)
+
+def save_submission(submission, assignment, student, submitted_file):
+    # Writes the file and the rows in one transaction, so it runs in a thread from async views
+    with transaction.atomic():
         # Update the file of the existing submission
         if submission:
             submission.file = submitted_file
-        # Create a new submission
+            submission.is_pdf = True
+            submission.save()
+        # Create a new submission and give it to a TA
         else:
             submission = models.Submission(
                 assignment=assignment,
                 author=student,
-                grader=grader,
                 file=submitted_file,
+                is_pdf=True,
                 score=None
             )
-        submission.save()
-
-        return redirect(f"/{assignment_id}/")
-    
-    return render(request, "assignment.html", additional_info)
+            submission.save()
+            scheduler.assign(submission)
 
 @login_required
 def submissions(request, assignment_id):
-    try:
-        assignment = models.Assignment.objects.get(id=assignment_id)
-    except models.Assignment.DoesNotExist:
-        raise Http404("Page does not exist.")
+    assignment = load_assignment(assignment_id)
     
     submissions = []
+    next_cursor = None
     errors = defaultdict(list)
     invalid_submission_ids = []
+    import_errors = []
     user = request.user
     additional_info = {"assignment": assignment,}
 
-    if not is_ta(user) and not user.is_superuser:
+    if not request.roles.is_ta and not request.roles.is_superuser:
         raise PermissionDenied("Only admins and TA's can view this page")
     
-    if request.method == "POST":
-        # Extract the submission ID's
+    if request.method == "POST" and "grades-file" in request.FILES:
+        # Grades uploaded as a CSV of username,score rows
+        _, import_errors = imports.import_grades(request.FILES["grades-file"], user, assignment=assignment)
+        if not import_errors:
+            return redirect(f"/{assignment_id}/submissions")
+        submissions, next_cursor = first_grading_page(request, assignment)
+    elif request.method == "POST":
+        # Extract the submission ID's and load all of those submissions in one query
         submission_ids = extract_data(request.POST)
+        found = assignment.submission_set.select_related("author").in_bulk(submission_ids)
         submissions_list = []
 
         for submission_id in submission_ids:
             # Submission object must exist for these submission and assignment IDs
-            try:
-                submission = models.Submission.objects.get(id=submission_id, assignment_id=assignment_id)
-            except models.Submission.DoesNotExist:
+            submission = found.get(submission_id)
+            if submission is None:
                 invalid_submission_ids.append(f"Submission ID 'grade-{submission_id}' does not exist.")
                 continue
 
@@ -134,113 +160,135 @@ def submissions(request, assignment_id):
 
             submissions.append({
                 "author": submission.author.get_full_name(),
-                "file": submission.file.url if submission.file else None,
+                "file": submission.url if submission.file else None,
                 "score": submission.score,
                 "id": submission.id,
                 "errors": errors[submission_id]
             })
 
-        models.Submission.objects.bulk_update(submissions_list, ["score"])
+        with transaction.atomic():
+            models.Submission.objects.bulk_update(submissions_list, ["score"])
+            counters.sync(submissions_list)
+            caching.bump(caching.SUBMISSIONS)
+            stats.invalidate(submissions_list)
         
         if all(not error for error in errors.values()) and not invalid_submission_ids:
             return redirect(f"/{assignment_id}/submissions")
     else:
-        if user.is_superuser:
-            # Get all submissions
-            for_grading = assignment.submission_set.select_related("author").all()
-        elif is_ta(user):
-            # Get submissions assigned to this TA
-            for_grading = assignment.submission_set.filter(grader=user).select_related("author").order_by("author__username")
-        else:
-            # Empty list for students
-            for_grading = []
-
-        for submission in for_grading:
-            submissions.append({
-                "author": submission.author.get_full_name(),
-                "file": submission.file.url if submission.file else None,
-                "score": submission.score,
-                "id": submission.id,
-                "errors": []
-            })
+        submissions, next_cursor = first_grading_page(request, assignment)
 
     additional_info["submissions"] = submissions
+    # The rest of the rows are fetched from submission_rows as the grader scrolls
+    additional_info["next_cursor"] = next_cursor
     additional_info["invalid_submission_ids"] = invalid_submission_ids
+    additional_info["import_errors"] = import_errors
     return render(request, "submissions.html", additional_info)
 
 @login_required
-def profile(request):
-    user = request.user
-    all_assignments = models.Assignment.objects.all()
-    assignments = []
-    current_grade = 0
+def submission_rows(request, assignment_id):
+    # A page of the grading table as HTML rows, in any of gradebook.SUBMISSION_SORTS
+    assignment = load_assignment(assignment_id)
+    if not request.roles.is_ta and not request.roles.is_superuser:
+        raise PermissionDenied("Only admins and TA's can view this page")
+    try:
+        submissions, next_cursor = pagination.page(request, for_grading(request, assignment), gradebook.SUBMISSION_SORTS, "author")
+    except pagination.InvalidPage as error:
+        return HttpResponseBadRequest(str(error))
+    html = render_to_string("submission_rows.html", {"submissions": grading_rows(submissions), "assignment": assignment})
+    return JsonResponse({"html": html, "next": next_cursor})
 
-    if user.is_superuser:
-        for assignment in all_assignments:
-            # Get the number of total graded submissions as well as the number of submissions overall
-            assignments.append({
-                "id": assignment.id,
-                "title": assignment.title,
-                "total_graded_count": assignment.submission_set.filter(score__isnull=False).count(),
-                "total_submissions_count": assignment.submission_set.count()
-            })
-    elif is_ta(user):
-        for assignment in all_assignments:
-            # Get the number of submissions that have been graded and the number of submissions assigned to this TA
-            assignments.append({
-                "id": assignment.id,
-                "title": assignment.title,
-                "graded_count": assignment.submission_set.filter(grader=user, score__isnull=False).count(),
-                "for_grading_count": assignment.submission_set.filter(grader=user).count()
-            })
+@login_required
+async def profile(request):
+    user = await request.auser()
+    roles = await request.aroles()
+    current_grade = 0
+    earned_points = available_points = 0
+    next_cursor = None
+
+    if roles.is_superuser:
+        # Get the number of total graded submissions as well as the number of submissions overall
+        assignments = await sync_to_async(assignment_summaries)()
+        key = lambda assignment: assignment.id
+    elif roles.is_ta:
+        # Get the number of submissions that have been graded and the number of submissions assigned to this TA
+        assignments = await sync_to_async(assignment_summaries)(grader=user)
+        key = lambda assignment: assignment.id
     else:
-        earned_points = 0
-        available_points = 0
-        for assignment in all_assignments:
-            """
-            1. Submitted and graded - Show score (score on submission divided by maximum points in assignment)
-            2. Submitted but not yet graded - Mark as 'Ungraded'
-            3. Not submitted because the assignment isn't due yet - Mark as 'Not Due'
-            4. Missing because the assignment is past due - Mark as 'Missing'
-            """
-            submission = assignment.submission_set.filter(author=user).first()
-            if submission:
-                if submission.score is not None:
-                    grade_percentage = submission.score / assignment.points
-                    status = f"{grade_percentage * 100}%"
-                    earned_points += grade_percentage * assignment.weight
-                    available_points += assignment.weight
-                else:
-                    status = "Ungraded"
-            else:
-                if assignment.deadline < timezone.now():
-                    status = "Missing"
-                    available_points += assignment.weight
-                else:
-                    status = "Not Due"
-
-            # Get the number of submissions that have been graded and number of submissions assigned to the grader
-            assignments.append({
-                "id": assignment.id,
-                "title": assignment.title,
-                "status": status,
-                "weight": assignment.weight
-            })
-
-            # print(f"{assignment.title}:")
-            # if submission and submission.score is not None: print(f"grade_percentage: {grade_percentage}    weight: {assignment.weight}")
-            # print(f"status: {status}    earned_points: {earned_points}    available_points: {available_points}")
-            # print("")
-
-        current_grade = "100.0%" if available_points == 0 else f"{round((earned_points / available_points) * 100, 1)}%"
+        # The current grade counts every assignment, even those past the first page, and so do the
+        # points it's made of, which hypothesized grades are added to
+        assignments, current_grade = await gradebook.astudent_grades(user)
+        earned_points, available_points = gradebook.weighted_points(assignments)
+        key = lambda assignment: assignment["id"]
+    if pagination.paged(request):
+        assignments, next_cursor = pagination.first_page(assignments, key)
 
     additional_info = {
         "assignments": assignments,
+        "next_cursor": next_cursor,
         "user": user,
-        "is_ta": is_ta(user),
-        "current_grade": current_grade
+        "is_staff": roles.is_superuser or roles.is_ta,
+        "current_grade": current_grade,
+        "earned_points": earned_points,
+        "available_points": available_points,
     }
-    return render(request, "profile.html", additional_info)
+    return await sync_to_async(render)(request, "profile.html", additional_info)
+
+@login_required
+def profile_rows(request):
+    # A page of the profile table as HTML rows: assignment summaries for staff, grades for students
+    roles = request.roles
+    try:
+        if roles.is_superuser or roles.is_ta:
+            queryset = gradebook.assignment_summaries(None if roles.is_superuser else request.user)
+            assignments, next_cursor = pagination.page(request, queryset, gradebook.SUMMARY_SORTS, "assignment")
+        else:
+            assignments, next_cursor = pagination.page(request, gradebook.student_assignments(request.user), gradebook.STUDENT_SORTS, "assignment")
+            assignments, _ = gradebook.grade_student_assignments(assignments)
+    except pagination.InvalidPage as error:
+        return HttpResponseBadRequest(str(error))
+    html = render_to_string("profile_rows.html", {"assignments": assignments, "is_staff": roles.is_superuser or roles.is_ta})
+    return JsonResponse({"html": html, "next": next_cursor})
+
+@login_required
+def statistics(request):
+    # Score distributions per assignment; TAs see the class and their own share, admins every grader's
+    roles = request.roles
+    if not roles.is_superuser and not roles.is_ta:
+        raise PermissionDenied("Only admins and TA's can view statistics")
+    grader = None if roles.is_superuser else request.user
+    assignments = models.Assignment.objects.only("id", "title", "points").order_by("id")
+    return render(request, "statistics.html", {"tables": [statistics_table(assignment, grader) for assignment in assignments]})
+
+def statistics_table(assignment, grader=None):
+    # Rendered once per change to the assignment's grades, for admins (grader None) and for each TA
+    return caching.get_or_set("statistics-table", [caching.ASSIGNMENTS, caching.scores(assignment.id)], lambda: render_to_string(
+        "statistics_table.html", {"assignment": assignment, "rows": statistics_rows(stats.assignment_statistics(assignment), grader), "percentiles": stats.PERCENTILES},
+    ), vary=[assignment.id, grader.id if grader else "all"])
+
+def statistics_rows(statistics, grader=None):
+    # (name, distribution) for the whole class, then each grader's share the viewer may see
+    graders = statistics["graders"]
+    ids = [grader.id] if grader else [grader_id for grader_id in graders if grader_id is not None]
+    users = User.objects.filter(id__in=[grader_id for grader_id in ids if grader_id in graders]).only("id", "username", "first_name", "last_name")
+    rows = sorted(((user.get_full_name() or user.username, graders[user.id]) for user in users), key=lambda row: row[0])
+    if grader is None and None in graders:
+        rows.append(("No grader", graders[None]))
+    return [("Everyone", statistics["all"]), *rows]
+
+@login_required
+def grades(request):
+    assignments, current_grade = gradebook.student_grades(request.user)
+    return JsonResponse({"assignments": assignments, "current_grade": current_grade})
+
+@login_required
+def export_gradebook(request):
+    if not request.roles.is_superuser:
+        raise PermissionDenied("Only admins can export the gradebook")
+
+    stream = export.astream_csv if isinstance(request, ASGIRequest) else export.stream_csv
+    response = StreamingHttpResponse(stream(export.gradebook_rows()), content_type="text/csv")
+    response["Content-Disposition"] = 'attachment; filename="gradebook.csv"'
+    return response
 
 def login_form(request):
     next_url = request.GET.get("next", "/profile/")
@@ -250,7 +298,14 @@ def login_form(request):
         username = request.POST.get("username", "")
         password = request.POST.get("password", "")
         next_url = request.POST.get("next", "/profile/")
-        user = authenticate(username=username, password=password)
+        try:
+            user = authenticate(request, username=username, password=password)
+        except logins.Busy:
+            # Every login thread is taken; the rest of the site keeps working meanwhile
+            error = "Too many people are logging in right now. Try again in a few seconds."
+            response = render(request, "login.html", {"next": next_url, "error": error}, status=503)
+            response["Retry-After"] = 5
+            return response
 
         if url_has_allowed_host_and_scheme(next_url, None):
             if user is not None:
@@ -270,21 +325,66 @@ def logout_form(request):
     return redirect("/profile/login/")
 
 @login_required
-def show_upload(request, filename):
+async def show_upload(request, filename):
+    # Async, so under ASGI a slow download holds a coroutine rather than a worker thread
     try:
-        submission = models.Submission.objects.get(file=filename)
-
-        if not submission.file.name.endswith(".pdf") or not next(submission.file.chunks()).startswith(b'%PDF-'):
-            raise Http404("File is not a PDF")
-        
-        response = HttpResponse(submission.view_submission(request.user).open())
-        response["Content-Type"] = "application/pdf"
-        response["Content-Disposition"] = f'attachment; filename="{submission.file.name}"'
-        
-        return response
+        submission = await models.Submission.objects.aget(key=filename)
     except models.Submission.DoesNotExist:
         raise Http404("Submission does not exist.")
 
+    # Checked once when the file was uploaded
+    if not submission.is_pdf:
+        raise Http404("File is not a PDF")
+
+    file = submission.view_submission(await request.auser())
+    # serve() stats and opens the file, which would block the event loop; no database, so any thread will do
+    return await sync_to_async(downloads.serve, thread_sensitive=False)(request, file, "application/pdf", filename=submission.key, tag=submission.sha256)
+
+def load_assignment(assignment_id):
+    # Assignments rarely change but are read on every page, description and all
+    def fetch():
+        try:
+            return models.Assignment.objects.get(id=assignment_id)
+        except models.Assignment.DoesNotExist:
+            raise Http404("Page does not exist.")
+    return caching.get_or_set("assignment", [caching.ASSIGNMENTS], fetch, vary=[assignment_id])
+
+def assignment_summaries(grader=None):
+    return caching.get_or_set(
+        "assignment-summaries",
+        [caching.ASSIGNMENTS, caching.SUBMISSIONS],
+        lambda: list(gradebook.assignment_summaries(grader)),
+        vary=[grader.id if grader else "all"],
+    )
+
+def for_grading(request, assignment):
+    if request.roles.is_superuser:
+        # Get all submissions
+        return assignment.submission_set.select_related("author")
+    elif request.roles.is_ta:
+        # Get submissions assigned to this TA
+        return assignment.submission_set.filter(grader=request.user).select_related("author")
+    else:
+        # No submissions for students
+        return assignment.submission_set.none()
+
+def first_grading_page(request, assignment):
+    submissions = for_grading(request, assignment)
+    if not pagination.paged(request):
+        # Nothing in the browser will fetch more rows, so render them all
+        return grading_rows(pagination.ordered(submissions, gradebook.SUBMISSION_SORTS["author"])), None
+    submissions, next_cursor = pagination.paginate(submissions, gradebook.SUBMISSION_SORTS["author"])
+    return grading_rows(submissions), next_cursor
+
+def grading_rows(submissions):
+    return [{
+        "author": submission.author.get_full_name(),
+        "file": submission.url if submission.file else None,
+        "score": submission.score,
+        "id": submission.id,
+        "errors": []
+    } for submission in submissions]
+
 def extract_data(request_data):
     submissions = []
     # Iterate through request.POST
@@ -296,15 +396,4 @@ def extract_data(request_data):
                 submissions.append(id)
             except ValueError:
                 continue
-    return submissions
-
-def pick_grader(assignment):
-    assistants = models.Group.objects.get(name="Teaching Assistants")
-    grader = assistants.user_set.annotate(total_assigned=Count("graded_set", filter=Q(graded_set__assignment=assignment))).order_by("total_assigned").first()
-    return grader
-
-def is_student(user):
-    return user.groups.filter(name="Students").exists()
-
-def is_ta(user):
-    return user.groups.filter(name="Teaching Assistants").exists()
\ No newline at end of file
+    return submissions
\ No newline at end of file
@@ -1,10 +1,20 @@
+import argparse
 import datetime
+import hashlib
+import multiprocessing
+import random
+import time
 
 import os, django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cs3550.settings")
 django.setup()
 
+from django.contrib.auth.hashers import make_password
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from grades import caching, counters, roles, uploads
 from grades.models import User, Group, Assignment, Submission
 
 def midnight(month, day):
@@ -371,7 +381,142 @@ pages for the grading application:</p>
         file=ContentFile("HW2 for Alice Algorithm", name="c2.txt"),
     )
 
+# Everyone in a --scale course shares one password, hashed once instead of once per user
+PASSWORD = "password"
+BATCH_SIZE = 5000
+
+def synthetic_pdf(seed, index):
+    # A small valid-looking PDF whose bytes depend only on the seed and index
+    body = hashlib.sha256(f"{seed}:{index}".encode()).hexdigest().encode() * 256
+    return uploads.PDF_MAGIC + b"1.4\n%% synthetic submission %d\n" % index + body + b"\n%EOF\n"
+
+def insert_rows(model, fields, rows):
+    # Plain executemany in batches: at this size bulk_create spends most of its time preparing
+    # each value through the ORM, so rows here must already hold database-ready values
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while batch := [row for _, row in zip(range(BATCH_SIZE), rows)]:
+            cursor.executemany(sql, batch)
+
+def submission_rows(job):
+    # Runs in a worker: decide who submitted one assignment, who grades it and the scores.
+    # Each assignment gets its own random stream, so the output doesn't depend on the worker count.
+    seed, number, closed, students, tas, submission_rate, graded_rate, blobs = job
+    rng = random.Random(f"{seed}:{number}")
+    rows = []
+    for student in range(students):
+        if rng.random() >= submission_rate:
+            continue
+        grader = len(rows) % tas if tas else None
+        graded = closed and grader is not None and rng.random() < graded_rate
+        score = float(rng.randint(0, 100)) if graded else None
+        rows.append((student, grader, score, rng.randrange(blobs)))
+    return number, rows
+
+def scaled_data(students=1000, tas=10, assignments=10, submission_rate=0.8, graded_rate=0.5, blobs=100, seed=0, workers=1, log=print):
+    """
+    Generate a synthetic course with batched inserts: users named student<i> and ta<i> plus an
+    "admin" superuser, half the assignments past due, and submissions that share `blobs` distinct
+    PDFs. Deadlines are relative to today, so the same seed gives the same data all day.
+    """
+    started = time.monotonic()
+    rng = random.Random(seed)
+    today = timezone.localtime().replace(hour=23, minute=59, second=59, microsecond=0)
+    password = make_password(PASSWORD)
+
+    # Blobs are content-addressed, so a rerun or another worker writing the same one is harmless
+    names, digests = [], []
+    for index in range(blobs):
+        pdf = ContentFile(synthetic_pdf(seed, index), name="submission.pdf")
+        names.append(default_storage.save(pdf.name, pdf))
+        digests.append(uploads.file_sha256(pdf))
+    log(f"Wrote {blobs} PDFs ({time.monotonic() - started:.1f}s)")
+
+    with transaction.atomic():
+        ta_group, _ = Group.objects.get_or_create(name=roles.TEACHING_ASSISTANTS)
+        student_group, _ = Group.objects.get_or_create(name=roles.STUDENTS)
+        User.objects.create(username="admin", first_name="Prof.", last_name="Admin", password=password, is_staff=True, is_superuser=True)
+        joined = connection.ops.adapt_datetimefield_value(timezone.now())
+        people = [(f"ta{i}", "TA", str(i)) for i in range(tas)] + [(f"student{i}", "Student", str(i)) for i in range(students)]
+        insert_rows(
+            User,
+            ["username", "first_name", "last_name", "email", "password", "is_staff", "is_active", "is_superuser", "date_joined"],
+            ((username, first, last, "", password, False, True, False, joined) for username, first, last in people),
+        )
+        by_username = dict(User.objects.exclude(username="admin").values_list("username", "id"))
+        ta_ids = [by_username[f"ta{i}"] for i in range(tas)]
+        student_ids = [by_username[f"student{i}"] for i in range(students)]
+        Membership = User.groups.through
+        insert_rows(
+            Membership,
+            ["user", "group"],
+            [(user_id, ta_group.id) for user_id in ta_ids] + [(user_id, student_group.id) for user_id in student_ids],
+        )
+        log(f"Created {students} students and {tas} TAs ({time.monotonic() - started:.1f}s)")
+
+        created = Assignment.objects.bulk_create([
+            Assignment(
+                title=f"Homework {number}",
+                description=f"<p>Synthetic assignment {number}.</p>",
+                deadline=today + datetime.timedelta(days=7 * (number - assignments // 2)),
+                weight=rng.randint(1, 100),
+                points=100,
+            )
+            for number in range(assignments)
+        ])
+        now = timezone.now()
+        jobs = [
+            (seed, number, assignment.deadline < now, students, tas, submission_rate, graded_rate, blobs)
+            for number, assignment in enumerate(created)
+        ]
+
+        # Workers only compute rows; inserting stays in this process, since SQLite has one writer
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        results = pool.imap(submission_rows, jobs) if pool else map(submission_rows, jobs)
+        def submissions():
+            for number, rows in results:
+                assignment_id = created[number].id
+                for student, grader, score, blob in rows:
+                    yield (
+                        assignment_id,
+                        student_ids[student],
+                        ta_ids[grader] if grader is not None else None,
+                        names[blob],
+                        score,
+                        True,
+                        f"hw{number}_student{student}.pdf",
+                        digests[blob],
+                    )
+        try:
+            insert_rows(Submission, ["assignment", "author", "grader", "file", "score", "is_pdf", "key", "sha256"], submissions())
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        total = Submission.objects.count()
+        log(f"Created {assignments} assignments and {total} submissions ({time.monotonic() - started:.1f}s)")
+
+        # The raw inserts skip the signals that keep these up to date
+        counters.rebuild()
+        caching.bump(caching.ASSIGNMENTS, caching.SUBMISSIONS)
+    log(f"Done in {time.monotonic() - started:.1f}s; every account's password is '{PASSWORD}'")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill an empty database with example data.")
+    parser.add_argument("--scale", action="store_true", help="generate a large synthetic course instead of the small example one")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--tas", type=int, default=10)
+    parser.add_argument("--assignments", type=int, default=10)
+    parser.add_argument("--submission-rate", type=float, default=0.8)
+    parser.add_argument("--graded-rate", type=float, default=0.5)
+    parser.add_argument("--blobs", type=int, default=100, help="number of distinct PDF files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="processes used to generate submissions")
+    options = parser.parse_args()
+
     if check_has_data():
         print("""It looks you've already run the makedata.py script.
 If you've changed the model and want to rerun the script, run:
@@ -382,5 +527,11 @@ If you've changed the model and want to rerun the script, run:
     python3 makedata.py
 """)
         exit(1)
-    initial_data()
+    if options.scale:
+        scaled_data(
+            options.students, options.tas, options.assignments, options.submission_rate,
+            options.graded_rate, options.blobs, options.seed, options.workers,
+        )
+    else:
+        initial_data()
 
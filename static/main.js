@@ -1,17 +1,18 @@
-import { $ } from "/static/jquery/src/jquery.js";
+// Relative, so buildstatic's esbuild finds the same file the browser would
+import { $ } from "./jquery/src/jquery.js";
 
 function say_hi(elt) {
     console.log("Welcome to", elt.text());
 }
 
 function make_table_sortable($table) {
-    // Select the sortable headers of the table
+    // Tables with a data-rows-url are sorted and paged by the server; the rest are sorted in the page
     const $sortableHeaders = $table.find("thead th.sort-column");
+    const sort = $table.data("rows-url") ? make_table_paged($table) : ($header, order) => sort_rows($table, $header, order);
+
     $sortableHeaders.on("click", (e) => {
-        const $headerToSort = $(e.target);
-        const columnIndex = $headerToSort.index();
-        let isAscending = false;
-        let unsorted = false;
+        const $headerToSort = $(e.currentTarget);
+        let order = null;
 
         // Change order depending on status
         // asc -> desc -> unsorted
@@ -21,45 +22,93 @@ function make_table_sortable($table) {
             $headerToSort.removeClass("sort-asc");
             $headerToSort.addClass("sort-desc");
             $headerToSort.attr("aria-sort", "descending");
+            order = "desc";
         } else if ($headerToSort.hasClass("sort-desc")) {
             // Change to unsorted order
             $headerToSort.removeClass("sort-desc");
             $headerToSort.removeAttr("aria-sort");
-            unsorted = true;
         } else {
             // Change to ascending order
             $headerToSort.addClass("sort-asc");
             $headerToSort.attr("aria-sort", "ascending");
-            isAscending = true;
+            order = "asc";
         }
 
-        // Convert from string to number, then sort
-        const rows = $table.find("tbody tr").toArray();
-        rows.sort((row1, row2) => {
-            let cell1, cell2;
-            let tdElement1 = $(row1).children("td").get(columnIndex);
-            let tdElement2 = $(row2).children("td").get(columnIndex);
-            
-            if (!unsorted) {
-                cell1 = parseFloat($(tdElement1).data("value")) || 0;
-                cell2 = parseFloat($(tdElement2).data("value")) || 0;
-            } else {
-                cell1 = $(row1).data("index");
-                cell2 = $(row2).data("index");
-            }
+        sort($headerToSort, order);
+    });
+}
 
-            if (isAscending || unsorted) {
-                return cell1 - cell2;
+function sort_rows($table, $header, order) {
+    // Sort by the data-value of the header's column, or back to the data-index order when order is null
+    const columnIndex = $header.index();
+    const rows = $table.find("tbody tr").toArray();
+    rows.sort((row1, row2) => {
+        let cell1, cell2;
+        let tdElement1 = $(row1).children("td").get(columnIndex);
+        let tdElement2 = $(row2).children("td").get(columnIndex);
+
+        if (order) {
+            cell1 = parseFloat($(tdElement1).data("value")) || 0;
+            cell2 = parseFloat($(tdElement2).data("value")) || 0;
+        } else {
+            cell1 = $(row1).data("index");
+            cell2 = $(row2).data("index");
+        }
+
+        return order === "desc" ? cell2 - cell1 : cell1 - cell2;
+    });
+
+    // Put rows back in the right order
+    $table.children("tbody").append(rows);
+}
+
+function make_table_paged($table) {
+    // Clicking a header reloads the first page in the new order, and "Load more" (clicked by itself
+    // as it scrolls into view) appends the next page. Returns the function that re-sorts the table.
+    const $tbody = $table.children("tbody");
+    const $loadMore = $('<button type="button" class="load-more">Load more</button>');
+    let query = {};
+
+    function show_load_more() {
+        $loadMore.toggle(!!$tbody.attr("data-next"));
+    }
+
+    function load(params, replace) {
+        $loadMore.prop("disabled", true);
+        $.getJSON($table.data("rows-url"), params).done((page) => {
+            if (replace) {
+                $tbody.html(page.html);
             } else {
-                return cell2 - cell1;
+                $tbody.append(page.html);
             }
+            $tbody.attr("data-next", page.next || "");
+            $table.trigger("rows:loaded");
+        }).always(() => {
+            $loadMore.prop("disabled", false);
+            show_load_more();
         });
+    }
 
-        // Put rows back in the right order
-        for (const row of rows) {
-            $(row).appendTo("tbody");
+    $loadMore.on("click", () => {
+        if ($tbody.attr("data-next") && !$loadMore.prop("disabled")) {
+            load({...query, after: $tbody.attr("data-next")}, false);
         }
     });
+
+    $table.after($loadMore);
+    show_load_more();
+    if ("IntersectionObserver" in window) {
+        new IntersectionObserver((entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) {
+                $loadMore.trigger("click");
+            }
+        }).observe($loadMore[0]);
+    }
+
+    return ($header, order) => {
+        query = order ? {sort: $header.data("sort"), order: order} : {};
+        load(query, true);
+    };
 }
 
 function make_form_async($form) {
@@ -97,6 +146,9 @@ function make_grade_hypothesized($table) {
         return;
     }
 
+    // Hypothesized grades by assignment id, with the assignment's weight, kept while rows are
+    // re-sorted or paged out and back in
+    const hypotheses = new Map();
     const $hypothesizeButton = $("<button>Hypothesize</button>");
     $table.before($hypothesizeButton);
 
@@ -105,6 +157,7 @@ function make_grade_hypothesized($table) {
             // Switch back to actual grades
             $table.removeClass("hypothesized");
             $hypothesizeButton.text("Hypothesize");
+            hypotheses.clear();
 
             // Remove number inputs and restore original text
             $table.find("tbody td").each(function() {
@@ -119,64 +172,74 @@ function make_grade_hypothesized($table) {
             // Switch to hypothesized grades
             $table.addClass("hypothesized");
             $hypothesizeButton.text("Actual grades");
+            hypothesize_rows($table, hypotheses);
+        }
 
-            // Replace contents of all "Not Due" or "Ungraded" <td> elements with a new number input
-            $table.find("tbody td").each(function() {
-                const $tdElement = $(this);
-                const status = $tdElement.text();
+        compute_current_grade($table, hypotheses);
+    });
 
-                if (status === "Not Due" || status === "Ungraded") {
-                    $tdElement.html('<input type="number" min="0" max="100" placeholder="">');
-                }
-            });
+    // Rows loaded from the server come with plain statuses
+    $table.on("rows:loaded", () => {
+        if ($table.hasClass("hypothesized")) {
+            hypothesize_rows($table, hypotheses);
+            compute_current_grade($table, hypotheses);
         }
-
-        compute_current_grade($table);
     });
 
-    $table.on("keyup", "input[type='number']", () => {
-        compute_current_grade($table);
+    $table.on("input", "input[type='number']", (e) => {
+        const $inputElement = $(e.currentTarget);
+        const $tdElement = $inputElement.closest("td");
+        hypotheses.set($tdElement.closest("tr").data("id"), {
+            value: $inputElement.val(),
+            weight: parseFloat($tdElement.data("weight")),
+        });
+        compute_current_grade($table, hypotheses);
     });
 }
 
-function compute_current_grade($table) {
-    let earnedPoints = 0;
-    let availablePoints = 0;
-
-    $table.find("tbody td.numeric-column").each(function() {
+function hypothesize_rows($table, hypotheses) {
+    // Replace contents of all "Not Due" or "Ungraded" <td> elements with a new number input,
+    // holding the grade hypothesized for that assignment before, if any
+    $table.find("tbody td").each(function() {
         const $tdElement = $(this);
-        const assignmentWeight = parseFloat($tdElement.data("weight"));
-        const $inputElement = $tdElement.find("input");
+        const status = $tdElement.text();
 
-        if ($table.hasClass("hypothesized") && $inputElement.length > 0) {
-            if ($inputElement.val() === "") {
-                return;
-            }
-
-            const gradePercentage = parseFloat($inputElement.val()) / 100;
-            earnedPoints += gradePercentage * assignmentWeight;
-            availablePoints += assignmentWeight;
-        } else {
-            const originalValue = parseFloat($tdElement.data("value")) || 0;
-
-            if ($tdElement.text() === "Missing") {
-                availablePoints += assignmentWeight;
-            } else if ($tdElement.text() !== "Not Due" && $tdElement.text() !== "Ungraded") {
-                // Use original value for completed assignments
-                const gradePercentage = originalValue / 100;
-                earnedPoints += gradePercentage * assignmentWeight;
-                availablePoints += assignmentWeight;
-            }
+        if (status === "Not Due" || status === "Ungraded") {
+            const $inputElement = $('<input type="number" min="0" max="100" placeholder="">');
+            const hypothesis = hypotheses.get($tdElement.closest("tr").data("id"));
+            $tdElement.empty().append($inputElement.val(hypothesis ? hypothesis.value : ""));
         }
     });
+}
+
+function compute_current_grade($table, hypotheses) {
+    // Start from the server's totals, which count every assignment whether its row is loaded or not,
+    // and add the hypothesized grades; those rows are ungraded or not due, so the totals leave them out
+    const $currentGrade = $table.find("tfoot td.numeric-column");
+    let earnedPoints = parseFloat($currentGrade.data("earned")) || 0;
+    let availablePoints = parseFloat($currentGrade.data("available")) || 0;
+
+    if ($table.hasClass("hypothesized")) {
+        hypotheses.forEach(({value, weight}) => {
+            if (value === "") {
+                return;
+            }
+            earnedPoints += parseFloat(value) / 100 * weight;
+            availablePoints += weight;
+        });
+    }
 
-    // Round current grade to one decimal place
-    let currentGrade = (earnedPoints / availablePoints) * 100;
-    currentGrade = Math.round(currentGrade * 10) / 10;
-    $table.find("tfoot td.numeric-column").text(`${currentGrade}%`);
+    // Round current grade to one decimal place, as the server does
+    const currentGrade = availablePoints === 0 ? 100 : (earnedPoints / availablePoints) * 100;
+    $currentGrade.text(`${currentGrade.toFixed(1)}%`);
 }
 
 say_hi($("h1"));
-make_table_sortable($("table.sortable"));
+// Tells the server this browser can fetch more rows, so it can render tables one page at a time
+// (see grades/pagination.py); without it they come whole
+document.cookie = "paged_tables=1; path=/; max-age=31536000; samesite=lax";
+$("table.sortable").each(function() {
+    make_table_sortable($(this));
+});
 make_form_async($("form.async-form"));
 make_grade_hypothesized($("#profile-table"));
\ No newline at end of file